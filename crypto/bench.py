@@ -0,0 +1,6 @@
+import sys
+from benchmarks import suite
+
+
+if __name__ == "__main__":
+    suite.main(sys.argv[1:])
@@ -0,0 +1,99 @@
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import aes
+
+
+def peak_rss() -> int:
+    """
+    Возвращает пиковый RSS текущего процесса в байтах
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+
+
+def legacy_loop(aes_obj, file_path: str, start_pos: int, end_pos: int) -> None:
+    """
+    Цикл шифрования в том виде, в каком он был до перехода на readinto/update_into
+    """
+    encryptor = aes_obj.cipher.encryptor()
+    with open(file_path, 'r+b') as f:
+        f.seek(start_pos)
+        remaining_size = end_pos - start_pos
+        while remaining_size > 0:
+            to_read = min(aes_obj.buffer_size, remaining_size)
+            file_block = f.read(to_read)
+            if not file_block:
+                break
+            encrypted_block = encryptor.update(file_block)
+            f.seek(-len(file_block), io.SEEK_CUR)
+            f.write(encrypted_block)
+            remaining_size -= len(file_block)
+        f.write(encryptor.finalize())
+
+
+def run_variant(variant: str, file_path: str, size: int, buffer_size: int) -> dict:
+    """
+    Шифрует файл одним из вариантов цикла и возвращает время и пиковую память
+    """
+    aes_obj = aes.Aes(buffer_size)
+    # ключ выводится заранее, чтобы PBKDF2 не попал в замер
+    aes_obj.init_cipher("bench")
+    rss_before = peak_rss()
+
+    start = time.perf_counter()
+    if variant == "before":
+        legacy_loop(aes_obj, file_path, 0, size)
+    else:
+        encryptor = aes_obj.cipher.encryptor()
+        aes_obj._process_file(file_path, 0, size, encryptor, variant)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "variant": variant,
+        "seconds": elapsed,
+        "throughput_mb_s": size / elapsed / 1024**2,
+        "peak_rss": peak_rss(),
+        "peak_rss_growth": peak_rss() - rss_before,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Сравнение цикла Aes до и после readinto/update_into")
+    parser.add_argument("--size", type=int, default=256 * 1024**2)
+    parser.add_argument("--buffer-size", type=int, default=4 * 1024**2)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(delete=False) as temp:
+        temp.truncate(args.size)
+        file_path = temp.name
+
+    results = []
+    try:
+        for variant in ("before", "after"):
+            # отдельный процесс на вариант, иначе пиковый RSS общий
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results.append(executor.submit(
+                    run_variant, variant, file_path, args.size, args.buffer_size).result())
+    finally:
+        os.remove(file_path)
+
+    print(json.dumps({"size": args.size, "buffer_size": args.buffer_size,
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import argparse
+import importlib.util
+from datetime import datetime, timezone
+
+CRYPTO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CRYPTO_DIR)
+# прогресс-бары только мешают замерам и JSON-выводу
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+from modules import aes, keys, zip, noise
+from utils.data_utils import parse_size
+
+
+def load_core():
+    """
+    Загружает класс Core из core.py
+
+    Пакет crypto/core/ перекрывает модуль core.py в sys.path,
+    поэтому модуль загружается напрямую по пути.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "core_module", os.path.join(CRYPTO_DIR, "core.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Core
+
+
+def measure(op: str, size: int, func, **params) -> dict:
+    """
+    Замеряет время выполнения операции над size байтами
+
+    Returns:
+        dict: Результат замера с пропускной способностью в МБ/с
+    """
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    return {
+        "op": op,
+        **params,
+        "bytes": size,
+        "seconds": seconds,
+        "mb_s": size / seconds / 1024**2 if seconds else None,
+    }
+
+
+def bench_aes(path: str, size: int, buffer_size: int, disk_mode: bool, workers: int = 1, pipeline: bool = False) -> list[dict]:
+    """
+    Шифрует и расшифровывает диапазон [0, size) на месте
+
+    После полного прогона данные не меняются, но прерванный замер
+    оставляет их зашифрованными, поэтому на устройстве нужен destructive.
+    """
+    schedule = keys.derive("bench")
+    aes_obj = aes.Aes(buffer_size, disk_mode, workers, pipeline)
+    params = {"buffer_size": buffer_size,
+              "workers": workers, "pipeline": pipeline}
+    return [
+        measure("aes_encrypt", size, lambda: aes_obj.process_file_part(
+            path, "", 0, size, aes.Mode.Encrypt, schedule), **params),
+        measure("aes_decrypt", size, lambda: aes_obj.process_file_part(
+            path, "", 0, size, aes.Mode.Decrypt, schedule), **params),
+    ]
+
+
+def bench_noise(path: str, size: int, buffer_size: int, disk_mode: bool, engine: str = "keystream") -> dict:
+    """
+    Заполняет шумом только диапазон [0, size), контрольная точка пишется во временную папку
+    """
+    Core = load_core()
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        core = Core({"container_path": path, "noise_engine": engine,
+                     "noise_checkpoint": os.path.join(checkpoint_dir, "noise_checkpoint.json")}, disk_mode)
+        core.buffer_size = buffer_size
+        return measure("create_noise", size, lambda: core.create_noise(size), buffer_size=buffer_size, engine=engine)
+
+
+def bench_noise_source(size: int, buffer_size: int, engine: str, threads: int) -> dict:
+    """
+    Замеряет только генерацию шума, без записи на диск
+    """
+    def generate():
+        for _ in noise.make_source(engine, threads).chunks(size, buffer_size):
+            pass
+
+    return measure("noise_generate", size, generate, buffer_size=buffer_size, engine=engine, workers=threads)
+
+
+def bench_hashsum(path: str, size: int, buffer_size: int, disk_mode: bool) -> dict:
+    Core = load_core()
+    core = Core({"container_path": path}, disk_mode)
+    # хеш читает кусками io_size, buffer_size на него не влияет
+    core.io_size = buffer_size
+    return measure("get_hashsum", size, lambda: core.get_hashsum(0, size), buffer_size=buffer_size)
+
+
+def bench_write_zip(path: str, size: int, buffer_size: int, disk_mode: bool) -> dict:
+    with tempfile.NamedTemporaryFile(delete=False) as source:
+        source.write(os.urandom(size))
+        source_path = source.name
+    try:
+        return measure("write_zip_to_cont", size, lambda: zip.write_zip_to_cont(
+            path, source_path, 0, buffer_size, disk_mode), buffer_size=buffer_size)
+    finally:
+        os.remove(source_path)
+
+
+def bench_read_archive(path: str, size: int, buffer_size: int, disk_mode: bool) -> dict:
+    temp_files = []
+
+    def read():
+        temp_files.append(zip.read_archive(path, 0, size, buffer_size, disk_mode))
+
+    try:
+        return measure("read_archive", size, read, buffer_size=buffer_size)
+    finally:
+        for temp_file in temp_files:
+            if temp_file:
+                temp_file.close()
+                os.remove(temp_file.name)
+
+
+def run_suite(path: str, size: int, buffer_sizes: list[int], workers_list: list[int], disk_mode: bool, destructive: bool) -> list[dict]:
+    """
+    Прогоняет все замеры на path
+
+    Без destructive выполняются только операции, которые читают
+    path и ничего в нём не пишут.
+    """
+    results = []
+    for buffer_size in buffer_sizes:
+        for engine in ("secrets", "keystream"):
+            for workers in workers_list:
+                results.append(bench_noise_source(
+                    size, buffer_size, engine, workers))
+            if destructive:
+                results.append(bench_noise(
+                    path, size, buffer_size, disk_mode, engine))
+        results.append(bench_hashsum(path, size, buffer_size, disk_mode))
+        if destructive:
+            # шифрование на месте: прерванный замер оставит данные зашифрованными
+            for workers in workers_list:
+                results.extend(bench_aes(path, size, buffer_size,
+                                         disk_mode, workers))
+            results.extend(bench_aes(path, size, buffer_size,
+                                     disk_mode, pipeline=True))
+            results.append(bench_write_zip(
+                path, size, buffer_size, disk_mode))
+        results.append(bench_read_archive(path, size, buffer_size, disk_mode))
+    return results
+
+
+def host_info() -> dict:
+    import cryptography
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "cryptography": cryptography.__version__,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="bench", description="Замеры пропускной способности шифрования и ввода-вывода")
+    parser.add_argument("--size", default="256m",
+                        help="объём данных на каждый замер")
+    parser.add_argument("--buffer-sizes", default="128k,1m,4m",
+                        help="размеры буфера через запятую")
+    parser.add_argument("--workers", default="1,2,4",
+                        help="количество процессов AES через запятую")
+    parser.add_argument("--device", default=None,
+                        help="диск (например E:) для замеров на устройстве")
+    parser.add_argument("--destructive", action="store_true",
+                        help="разрешить замеры, перезаписывающие данные на устройстве")
+    parser.add_argument("--output", default=None,
+                        help="файл для JSON-результатов (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    size = parse_size(args.size)
+    buffer_sizes = [parse_size(value) for value in args.buffer_sizes.split(",")]
+    workers_list = [int(value) for value in args.workers.split(",")]
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": host_info(),
+        "size": size,
+        "targets": [],
+    }
+
+    with tempfile.NamedTemporaryFile(delete=False) as temp:
+        temp.truncate(size)
+        temp_path = temp.name
+    try:
+        report["targets"].append({
+            "target": "tempfile",
+            "results": run_suite(temp_path, size, buffer_sizes, workers_list, False, True),
+        })
+    finally:
+        os.remove(temp_path)
+
+    if args.device is not None:
+        device = args.device
+        if len(device) == 2 and device[1] == ":":
+            device = rf"\\.\{device}"
+        report["targets"].append({
+            "target": device,
+            "results": run_suite(device, size, buffer_sizes, workers_list, True, args.destructive),
+        })
+
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
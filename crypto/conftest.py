@@ -43,6 +43,43 @@ def temp_container():
             os.remove(temp_path)
 
 
+@pytest.fixture
+def core_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "core.py")
+
+
+@pytest.fixture
+def core_class(core_path):
+    # core.py is shadowed by the crypto/core/ package, load it from its file
+    from modules import layers
+    return layers._load_core(core_path)
+
+
+@pytest.fixture
+def core_conf(tmp_path):
+    return {
+        "container_path": str(tmp_path / "c.bin"),
+        "new_container_size": "20m",
+        "block_size": "1m",
+        "buffer_size": "64k",
+        "noise_checkpoint": str(tmp_path / "noise.json"),
+    }
+
+
+@pytest.fixture
+def core(core_class, core_conf):
+    return core_class(core_conf)
+
+
+@pytest.fixture
+def layer_conf(tmp_path):
+    """Encrypt config of one layer holding src/data.bin"""
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "data.bin").write_bytes(os.urandom(50000))
+    return {"files": [""], "directories": [str(source)], "password": "12345"}
+
+
 @pytest.fixture
 def random_data():
     data_512b = os.urandom(512)
@@ -109,15 +109,70 @@ def main():
     # Получаем путь к конфигурационному файлу из аргументов командной строки
     if len(sys.argv) < 2:
         print("Использование: python controll.py <путь_к_конфигу>")
+        print("               python controll.py bench [параметры]")
+        print("               python controll.py extract <шаблон> <путь_к_конфигу>")
+        print("               python controll.py list <путь_к_конфигу>")
+        print("               python controll.py --plan <путь_к_конфигу>")
+        return
+
+    # Замеры производительности не требуют конфига
+    if sys.argv[1] == "bench":
+        from benchmarks import suite
+        suite.main(sys.argv[2:])
         return
         
-    config_path = sys.argv[1]
+    # План выполнения: только оценка объёмов и времени, ничего не запускается
+    if sys.argv[1] == "--plan":
+        if len(sys.argv) < 3:
+            print("Использование: python controll.py --plan <путь_к_конфигу>")
+            return
+        from modules import config, plan
+        data = config.parse_data(sys.argv[2])
+        cache_path = os.path.join(os.path.dirname(os.path.abspath(sys.argv[2])), Def_val.calibration_cache)
+        for line in plan.format_plan(plan.build(data, cache_path,
+                                                data.get("bench_report", Def_val.bench_report))):
+            print(line)
+        return
+
+    # Извлечение отдельных файлов по шаблону и просмотр содержимого слоёв
+    # используют секцию дешифрования
+    pattern = None
+    listing = False
+    if sys.argv[1] == "extract":
+        if len(sys.argv) < 4:
+            print("Использование: python controll.py extract <шаблон> <путь_к_конфигу>")
+            return
+        pattern = sys.argv[2]
+        config_path = sys.argv[3]
+    elif sys.argv[1] == "list":
+        if len(sys.argv) < 3:
+            print("Использование: python controll.py list <путь_к_конфигу>")
+            return
+        listing = True
+        config_path = sys.argv[2]
+    else:
+        config_path = sys.argv[1]
     
     # Импортируем модуль config только здесь, чтобы избежать циклических импортов
     from modules import config
     
     # Загружаем конфигурацию
     data = config.load_config(config_path)
+
+    # Контрольная точка заполнения шумом и замеры буфера хранятся рядом с конфигом
+    data.setdefault("noise_checkpoint", os.path.join(
+        os.path.dirname(os.path.abspath(config_path)), Def_val.noise_checkpoint))
+    data.setdefault("calibration_cache", os.path.join(
+        os.path.dirname(os.path.abspath(config_path)), Def_val.calibration_cache))
+
+    if pattern is not None or listing:
+        if "decrypt" not in data:
+            logging.error(Msg.Warn.object_doesnt_exist("decrypt"))
+            return
+        data.pop("encrypt", None)
+        if pattern is not None:
+            data["decrypt"]["pattern"] = pattern
+        data["decrypt"]["list"] = listing
     
     # Устанавливаем приоритет процесса
     if "cpu_priority" in data:
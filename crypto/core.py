@@ -1,11 +1,14 @@
 import os
 import sys
-import secrets
-import zlib
-from modules import aes, winDiskHandler, zip, header
+import time
+import queue
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from modules import aes, winDiskHandler, zip, header, keys, calibrate, noise, hashing, manifest, layers, chunk_store
 from modules.wrapers.logging import logging
 from modules.constants import Msg, Def_val
 from modules import config as conf
+from wrappers import safe_operations
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 
@@ -16,6 +19,28 @@ class Core:
     size_of_new_container: int = parse_size(Def_val.new_container_size)
     block_size: int = parse_size(Def_val.block_size)
     buffer_size: int = parse_size(Def_val.buffer_size)
+    # read chunk of hashing and manifest passes; buffer_size stays the
+    # AES-XTS data unit, which has to match between encrypt and decrypt
+    io_size: int = parse_size(Def_val.buffer_size)
+    workers: int = Def_val.workers
+    pipeline: bool = Def_val.pipeline
+    fused_write: bool = Def_val.fused_write
+    noise_engine: str = Def_val.noise_engine
+    noise_threads: int = Def_val.noise_threads
+    noise_checkpoint: str = Def_val.noise_checkpoint
+    noise_checkpoint_interval: str = Def_val.noise_checkpoint_interval
+    calibration_cache: str = Def_val.calibration_cache
+    hash_algorithm: str = Def_val.hash_algorithm
+    hash_threads: int = Def_val.hash_threads
+    manifest_path: str = Def_val.manifest
+    manifest_verify: bool = Def_val.manifest_verify
+    layer_workers: int = Def_val.layer_workers
+    layer_memory: str = Def_val.layer_memory
+    decrypt_workers: int = Def_val.decrypt_workers
+    zip_workers: int = Def_val.zip_workers
+    layer_output: str = Def_val.layer_output
+    progress = None
+    auto_buffer: bool = False
     disk_mode: bool = False
 
     def __init__(self, conf, disk_mode=False) -> None:
@@ -26,13 +51,69 @@ class Core:
             self.size_of_new_container = parse_size(conf["new_container_size"])
         if "block_size" in conf:
             self.block_size = parse_size(conf["block_size"])
-        if "buffer_size" in conf:
+        if conf.get("buffer_size") == "auto":
+            self.auto_buffer = True
+        elif "buffer_size" in conf:
             self.buffer_size = parse_size(conf["buffer_size"])
+            self.io_size = self.buffer_size
+        if "workers" in conf:
+            self.workers = int(conf["workers"])
+        if "pipeline" in conf:
+            self.pipeline = conf["pipeline"]
+        if "fused_write" in conf:
+            self.fused_write = conf["fused_write"]
+        if "noise_engine" in conf:
+            self.noise_engine = conf["noise_engine"]
+        if "noise_threads" in conf:
+            self.noise_threads = int(conf["noise_threads"])
+        if "noise_checkpoint" in conf:
+            self.noise_checkpoint = conf["noise_checkpoint"]
+        if "noise_checkpoint_interval" in conf:
+            self.noise_checkpoint_interval = conf["noise_checkpoint_interval"]
+        if "calibration_cache" in conf:
+            self.calibration_cache = conf["calibration_cache"]
+        if "hash_algorithm" in conf:
+            self.hash_algorithm = conf["hash_algorithm"]
+        if "hash_threads" in conf:
+            self.hash_threads = int(conf["hash_threads"])
+        if "manifest" in conf:
+            self.manifest_path = conf["manifest"]
+        if "manifest_verify" in conf:
+            self.manifest_verify = conf["manifest_verify"]
+        if "layer_workers" in conf:
+            self.layer_workers = int(conf["layer_workers"])
+        if "layer_memory" in conf:
+            self.layer_memory = conf["layer_memory"]
+        if "decrypt_workers" in conf:
+            self.decrypt_workers = int(conf["decrypt_workers"])
+        if "zip_workers" in conf:
+            self.zip_workers = int(conf["zip_workers"])
+        if "layer_output" in conf:
+            self.layer_output = conf["layer_output"]
 
         self.disk_mode = disk_mode
+        self.schedules = {}
+        if "schedules" in conf:
+            self.schedules.update(conf["schedules"])
+        if self.auto_buffer:
+            self.calibrate_buffer_size()
 
     def set_disk_mode(self, mode: bool) -> None:
         self.disk_mode = mode
+        if self.auto_buffer:
+            self.calibrate_buffer_size()
+
+    def calibrate_buffer_size(self) -> None:
+        # a container that does not exist yet keeps the default buffer size
+        if not self.disk_mode and not os.path.isfile(self.container_path):
+            return
+        container_size = self.get_container_size()
+        if not container_size:
+            return
+        buffer_size = calibrate.calibrate(
+            self.container_path, self.disk_mode, container_size, self.calibration_cache, self.hash_algorithm)
+        if buffer_size:
+            self.io_size = buffer_size
 
     def change_container_path(self, new_container_path: str) -> None:
         self.container_path = new_container_path
@@ -52,64 +133,87 @@ class Core:
             container_size = handle.get_disk_size()
             return container_size
 
-    def create_noise(self) -> None:
-        bytes_to_write = self.get_container_size()
+    def noise_pending(self) -> bool:
+        # a missing container or an interrupted fill that left zeros behind
+        if not os.path.exists(self.container_path):
+            return True
+        return noise.fill_pending(self.noise_checkpoint,
+                                  noise.checkpoint_identity(self.container_path, self.disk_mode))
+
+    def create_noise(self, size: int | None = None) -> None:
+        # size limits the fill to [0, size), e.g. for benchmarks on a device;
+        # a container file is recreated with that size
+        from utils.data_utils import parse_size
+        bytes_to_write = size if size is not None else self.get_container_size()
         if bytes_to_write is None:
             bytes_to_write = self.size_of_new_container
-        parts = bytes_to_write // self.buffer_size
-        additional = bytes_to_write % self.buffer_size
+        source = noise.make_source(self.noise_engine, self.noise_threads)
+        interval = parse_size(self.noise_checkpoint_interval)
+
+        identity = noise.checkpoint_identity(self.container_path, self.disk_mode)
+        if not self.disk_mode and not os.path.exists(self.container_path):
+            # the file was removed after an interrupted fill, start over
+            noise.clear_checkpoint(self.noise_checkpoint)
+        start = noise.load_checkpoint(
+            self.noise_checkpoint, identity, bytes_to_write, self.buffer_size)
+        if start:
+            logging.info(Msg.Info.resuming_noise(start, bytes_to_write))
+        else:
+            # marks the fill as started before the first byte is written
+            noise.save_checkpoint(self.noise_checkpoint, identity, bytes_to_write, 0)
+        last_saved = start
 
         if not self.disk_mode:
-            with open(self.container_path, 'wb') as device:
-                with aes.tqdm(total=bytes_to_write, desc=Msg.PBar.filling_container_with_noise, unit="B", unit_scale=True) as pbar:
-                    for i in range(parts):
-                        buffer = secrets.token_bytes(self.buffer_size)
-                        device.write(buffer)
-                        pbar.update(self.buffer_size)
-
-                    if additional > 0:
-                        buffer = secrets.token_bytes(additional)
+            # the file gets its final size up front, so an interrupted fill
+            # still matches the checkpoint size on the next run
+            with open(self.container_path, 'r+b' if start else 'wb') as device:
+                if not start:
+                    device.truncate(bytes_to_write)
+                device.seek(start)
+                with aes.tqdm(total=bytes_to_write, initial=start, desc=Msg.PBar.filling_container_with_noise, unit="B", unit_scale=True) as pbar:
+                    for position, buffer in source.chunks(bytes_to_write, self.buffer_size, start):
                         device.write(buffer)
-                        pbar.update(self.buffer_size)
+                        pbar.update(len(buffer))
+                        done = position + len(buffer)
+                        if done - last_saved >= interval and done < bytes_to_write:
+                            device.flush()
+                            os.fsync(device.fileno())
+                            noise.save_checkpoint(
+                                self.noise_checkpoint, identity, bytes_to_write, done)
+                            last_saved = done
         else:
             handle = winDiskHandler.DiskHandler(
                 self.container_path, self.buffer_size)
-            with aes.tqdm(total=bytes_to_write, desc=Msg.PBar.filling_container_with_noise, unit="B", unit_scale=True) as pbar:
-                current_offset = 0
-                for i in range(parts):
-                    buffer = secrets.token_bytes(self.buffer_size)
-                    handle.write_aligned_data(current_offset, buffer)
-                    current_offset += self.buffer_size
-                    pbar.update(self.buffer_size)
-
-                if additional > 0:
-                    buffer = secrets.token_bytes(additional)
-                    handle.write_aligned_data(current_offset, buffer)
-                    current_offset += additional
-                    pbar.update(self.buffer_size)
+            with aes.tqdm(total=bytes_to_write, initial=start, desc=Msg.PBar.filling_container_with_noise, unit="B", unit_scale=True) as pbar:
+                for position, buffer in source.chunks(bytes_to_write, self.buffer_size, start):
+                    handle.write_aligned_data(position, bytes(buffer))
+                    pbar.update(len(buffer))
+                    done = position + len(buffer)
+                    if done - last_saved >= interval and done < bytes_to_write:
+                        # the checkpoint must not get ahead of the device
+                        handle.flush()
+                        noise.save_checkpoint(
+                            self.noise_checkpoint, identity, bytes_to_write, done)
+                        last_saved = done
             handle.close_disk()
 
+        noise.clear_checkpoint(self.noise_checkpoint)
+        # the old manifest describes data that no longer exists
+        if self.manifest_path and os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+    def prepare_keys(self, passwords) -> None:
+        missing = [password for password in passwords
+                   if password not in self.schedules]
+        self.schedules.update(keys.derive_schedules(missing))
+
+    def get_schedule(self, password: str) -> keys.KeySchedule:
+        if password not in self.schedules:
+            self.schedules[password] = keys.derive(password)
+        return self.schedules[password]
+
     def get_iv(self, password: str) -> bytes:
-        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-        from cryptography.hazmat.primitives import hashes
-        from cryptography.hazmat.backends import default_backend
-
-        def derive_iv(password, iv_iterations, iv_size):
-            backend = default_backend()
-            salt = password.encode()
-            kdf_iv = PBKDF2HMAC(
-                algorithm=hashes.SHA1(),
-                length=iv_size,
-                salt=salt,
-                iterations=iv_iterations,
-                backend=backend
-            )
-            return kdf_iv.derive(password.encode())
-        iv_iterations = 12332
-        iv_size = 16
-
-        return derive_iv(
-            password, iv_iterations, iv_size)
+        return self.get_schedule(password).header_iv
 
     def get_hashsum(self, start_pos: int, end_pos: int) -> str | None:
         if start_pos == end_pos:
@@ -120,68 +224,66 @@ class Core:
         if end_pos > container_size:
             end_pos = container_size
 
-        def align_data(pbar, handle, remaining_size, offset, current_offset, crc):
-            sec_size = self.buffer_size
-            start_pos = sec_size * (offset // sec_size)
-            end_pos = start_pos + sec_size
-            align_read_size = end_pos - offset
-
-            read_size = min(align_read_size, remaining_size)
-            chunk = handle.read_data(current_offset, read_size)
-            current_offset += read_size
-            remaining_size -= read_size
-            pbar.update(read_size)
-
-            return remaining_size, current_offset, zlib.crc32(chunk, crc)
-
-        crc = 0
         total_size = end_pos - start_pos
-        remaining_size = total_size
-
         with aes.tqdm(total=total_size, desc=Msg.PBar.fetching_container_hash, unit="B", unit_scale=True) as pbar:
-            if not self.disk_mode:
-                with open(self.container_path, "rb") as f:
-                    f.seek(start_pos)
-                    while remaining_size > 0:
-                        read_size = min(self.buffer_size, remaining_size)
-                        chunk = f.read(read_size)
-
-                        remaining_size -= read_size
-                        pbar.update(read_size)
-                        if not chunk:
-                            break
-                        crc = zlib.crc32(chunk, crc)
-            else:
-                handle = winDiskHandler.DiskHandler(
-                    self.container_path, self.buffer_size)
-                current_offset = start_pos
-
-                sec_size = self.buffer_size
-                if start_pos % sec_size:
-                    remaining_size, current_offset, crc = align_data(
-                        pbar, handle, remaining_size, start_pos, current_offset, crc)
-
-                while remaining_size > 0:
-                    read_size = min(self.buffer_size, remaining_size)
-                    chunk = handle.read_data(current_offset, read_size)
-                    current_offset += read_size
-                    remaining_size -= read_size
-                    pbar.update(read_size)
-
-                    crc = zlib.crc32(chunk, crc)
-                handle.close_disk()
-        return hex(crc & 0xffffffff)[2:]
+            return hashing.hash_range(self.container_path, self.disk_mode, self.io_size, start_pos, end_pos,
+                                      self.hash_algorithm, self.hash_threads, pbar=pbar)
 
-    def get_container_parts(self, file_start_pos: int, file_end_pos: int, hashsum_limit: int):
-        first_part_s = file_start_pos - 1 - hashsum_limit
-        first_part_e = file_start_pos - 1
-        first_part_hash = self.get_hashsum(first_part_s, first_part_e)
+    def get_first_part(self, file_start_pos: int, hashsum_limit: int) -> str | None:
+        return self.get_hashsum(file_start_pos - 1 - hashsum_limit, file_start_pos - 1)
 
-        second_part_s = file_end_pos + 1
-        second_part_e = second_part_s + hashsum_limit
-        second_part_hash = self.get_hashsum(second_part_s, second_part_e)
+    def get_second_part(self, file_end_pos: int, hashsum_limit: int) -> str | None:
+        return self.get_hashsum(file_end_pos + 1, file_end_pos + 1 + hashsum_limit)
 
-        return first_part_hash, second_part_hash
+    def get_container_parts(self, file_start_pos: int, file_end_pos: int, hashsum_limit: int):
+        # both parts are read-only and disjoint, hash them side by side
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first_part = pool.submit(
+                self.get_first_part, file_start_pos, hashsum_limit)
+            second_part_hash = self.get_second_part(file_end_pos, hashsum_limit)
+            return first_part.result(), second_part_hash
+
+    def check_manifest(self, passwords, changed_ranges=()) -> manifest.Manifest | None:
+        # Brings the manifest in line with the container. By default only
+        # the blocks inside changed_ranges, which the current operation
+        # rewrote, are hashed again. With manifest_verify the whole container
+        # is hashed and every other block that differs from the stored
+        # manifest is reported.
+        if not self.manifest_path:
+            return None
+        container_size = self.get_container_size()
+        if not container_size:
+            return None
+
+        stored = None
+        if not os.path.exists(self.manifest_path):
+            # a new or refilled container: nothing to verify against yet
+            logging.info(Msg.Info.manifest_not_created(self.manifest_path))
+        else:
+            stored = manifest.load(self.manifest_path, passwords)
+            if stored is None:
+                logging.warning(Msg.Warn.manifest_unavailable(self.manifest_path))
+        if stored is not None and not self.manifest_verify \
+                and (stored.size, stored.block_size) == (container_size, Def_val.manifest_block_size):
+            return manifest.refresh(stored, self.container_path, self.disk_mode, self.io_size,
+                                    changed_ranges, self.hash_threads)
+
+        current = manifest.build(self.container_path, self.disk_mode, self.io_size,
+                                 container_size, Def_val.manifest_block_size, self.hash_threads)
+        if stored is None or not self.manifest_verify:
+            return current
+
+        expected = set()
+        for start_pos, end_pos in changed_ranges:
+            expected.update(current.blocks_in(start_pos, end_pos))
+        damaged = [index for index in stored.diff(current) if index not in expected]
+        for index in damaged:
+            start_pos = index * current.block_size
+            logging.error(Msg.Err.manifest_damaged_block(
+                index, start_pos, min(start_pos + current.block_size, current.size)))
+        if not damaged:
+            logging.info(Msg.Info.manifest_verified(self.manifest_path))
+        return current
 
     def check_integrality(self, old_hashsum: str, new_hashsum: str, check_object: str) -> None:
         logging.info(f"Validating {check_object}")
@@ -193,7 +295,7 @@ class Core:
             logging.warning(Msg.Warn.old_and_new_hash(
                 old_hashsum, new_hashsum))
 
-    def encrypt_archive(self, encrypt_config) -> None:
+    def encrypt_archive(self, encrypt_config) -> tuple[int, int] | None:
         from utils.data_utils import parse_size
 
         files = encrypt_config['files']
@@ -203,35 +305,64 @@ class Core:
         if "hashsum_limit" in encrypt_config:
             hashsum_limit = parse_size(encrypt_config["hashsum_limit"])
 
-        if not os.path.exists(self.container_path):
+        if self.noise_pending():
             self.create_noise()
+        elif encrypt_config.get("incremental", Def_val.incremental):
+            updated = self.update_archive(encrypt_config, hashsum_limit)
+            if updated is not None:
+                return updated
+            logging.warning(Msg.Warn.layer_rebuilt)
 
         offset = len(password) * self.block_size
         passwd_offset = header.calculate_offset(password, 1024)
         header_size = passwd_offset + header.data_size
-        iv = self.get_iv(password)
+        schedule = self.get_schedule(password)
+        iv = schedule.header_iv
 
         extra_dir = conf.get_extradir(encrypt_config)
         if extra_dir != "":
             if not os.path.isdir(extra_dir):
                 logging.warning(Msg.Warn.extra_dir_is_not_dir(extra_dir))
 
-        archive_size = zip.zip_archive(
-            self.container_path, offset + header_size, files, directories, extra_dir, self.buffer_size, self.disk_mode)
+        aes_obj = aes.Aes(self.buffer_size, self.disk_mode,
+                          self.workers, self.pipeline)
+        fused_aes = None
+        if self.fused_write:
+            aes_obj.init_cipher(password, schedule)
+            fused_aes = aes_obj
+
+        # The "before" hashes cover bytes outside [offset, end_pos), which the
+        # ZIP build, the header write and the encryption never touch, so they
+        # are computed in the background while that work runs.
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            old_first_future = pool.submit(
+                self.get_first_part, offset, hashsum_limit)
+
+            archive_size = zip.zip_archive(
+                self.container_path, offset + header_size, files, directories, extra_dir, self.buffer_size, self.disk_mode, fused_aes,
+                zip.CompressionPolicy.from_config(encrypt_config), self.zip_workers)
+
+            if archive_size == 0:
+                # a header with a zero size would report an empty layer as
+                # written; the range keeps whatever the build left there
+                logging.error(Msg.Err.layer_not_written(offset))
+                return None
 
-        old_first_part, old_second_part = self.get_container_parts(
-            offset, offset + header_size + archive_size, hashsum_limit)
+            old_second_future = pool.submit(
+                self.get_second_part, offset + header_size + archive_size, hashsum_limit)
 
-        header.write(self.container_path, offset, passwd_offset, iv,
-                     archive_size, self.buffer_size, self.disk_mode)
+            header.write(self.container_path, offset, passwd_offset, iv,
+                         archive_size, self.buffer_size, self.disk_mode)
 
-        start_pos = offset + header_size
-        end_pos = start_pos + archive_size
+            start_pos = offset + header_size
+            end_pos = start_pos + archive_size
 
-        aes_obj = aes.Aes(self.buffer_size, self.disk_mode)
+            if not self.fused_write:
+                aes_obj.process_file_part(self.container_path, password,
+                                          start_pos, end_pos, aes.Mode.Encrypt, schedule)
 
-        aes_obj.process_file_part(self.container_path, password,
-                                  start_pos, end_pos, aes.Mode.Encrypt)
+            old_first_part = old_first_future.result()
+            old_second_part = old_second_future.result()
 
         new_first_part, new_second_part = self.get_container_parts(
             offset, offset + header_size + archive_size, hashsum_limit)
@@ -242,7 +373,47 @@ class Core:
             self.check_integrality(
                 old_second_part, new_second_part, "The second part")
 
-    def decrypt_archive(self, output_path: str, password: str) -> None:
+        return offset, end_pos
+
+    def update_archive(self, encrypt_config, hashsum_limit: int) -> tuple[int, int] | None:
+        # Incremental variant of encrypt_archive for a layer that already
+        # exists under this password; None means it has to be rebuilt.
+        password = encrypt_config['password']
+        offset = len(password) * self.block_size
+        passwd_offset = header.calculate_offset(password, 1024)
+        header_size = passwd_offset + header.data_size
+        schedule = self.get_schedule(password)
+        ok, archive_size = header.read(
+            self.container_path, offset, passwd_offset, schedule.header_iv, self.buffer_size, self.disk_mode)
+        if not ok:
+            return None
+
+        aes_obj = aes.Aes(self.buffer_size, self.disk_mode)
+        aes_obj.init_cipher(password, schedule)
+        old_first_part = self.get_first_part(offset, hashsum_limit)
+
+        result = zip.update_archive(self.container_path, offset + header_size, archive_size,
+                                    encrypt_config['files'], encrypt_config['directories'],
+                                    conf.get_extradir(encrypt_config), self.buffer_size, self.disk_mode,
+                                    aes_obj, Def_val.incremental_compact, zip.CompressionPolicy.from_config(encrypt_config))
+        if result is None:
+            return None
+        new_size, changed, removed = result
+        if not changed and not removed:
+            logging.info(Msg.Info.layer_up_to_date)
+        else:
+            logging.info(Msg.Info.layer_updated(changed, removed))
+        if new_size != archive_size:
+            header.write(self.container_path, offset, passwd_offset, schedule.header_iv,
+                         new_size, self.buffer_size, self.disk_mode)
+
+        new_first_part = self.get_first_part(offset, hashsum_limit)
+        if old_first_part is not None and new_first_part is not None:
+            self.check_integrality(
+                old_first_part, new_first_part, "The first part")
+        return offset, offset + header_size + max(new_size, archive_size)
+
+    def decrypt_archive(self, output_path: str, password: str, readonly: bool = Def_val.readonly, decoy: bool = Def_val.decoy) -> None:
         if not os.path.exists(self.container_path):
             aes.logging.error(Msg.Warn.container_doesnt_exist)
             return
@@ -250,34 +421,218 @@ class Core:
         offset = len(password) * self.block_size
         passwd_offset = header.calculate_offset(password, 1024)
         header_size = passwd_offset + header.data_size
-        iv = self.get_iv(password)
+        schedule = self.get_schedule(password)
+        iv = schedule.header_iv
 
         ok, archive_size = header.read(
             self.container_path, offset, passwd_offset, iv, self.buffer_size, self.disk_mode)
 
+        # The header IV is checked before any bulk work, so a wrong password
+        # never touches the layer and costs only the header read.
+        if not ok:
+            self.reject_password(archive_size, output_path, decoy)
+            return
+
         start_pos = offset + header_size
         end_pos = start_pos + archive_size
-        aes_obj = aes.Aes(self.buffer_size, self.disk_mode)
+        aes_obj = aes.Aes(self.buffer_size, self.disk_mode,
+                          self.workers, self.pipeline)
+
+        if readonly:
+            with aes_obj.open_reader(self.container_path, password,
+                                     start_pos, end_pos, schedule) as reader:
+                reader.progress = self.progress
+                zip.unzip_stream(reader, output_path)
+            return
 
         aes_obj.process_file_part(self.container_path, password,
-                                  start_pos, end_pos, aes.Mode.Decrypt)
-
-        if not ok:
-            aes.logging.error(Msg.Err.wrong_pass)
-            return
+                                  start_pos, end_pos, aes.Mode.Decrypt, schedule)
 
         zip.unzip_archive(self.container_path, offset + header_size,
                           offset + archive_size + header_size, output_path, self.buffer_size, self.disk_mode)
 
         aes_obj.process_file_part(self.container_path, password,
-                                  start_pos, end_pos, aes.Mode.Encrypt)
+                                  start_pos, end_pos, aes.Mode.Encrypt, schedule)
 
-    def encrypt_container(self, encrypt_config) -> None:
-        if isinstance(encrypt_config, list):
-            for encrypt_conf in encrypt_config:
-                self.encrypt_archive(encrypt_conf)
+    def reject_password(self, archive_size: int, output_path: str, decoy: bool) -> None:
+        # every subcommand answers a wrong password the same way
+        from utils.data_utils import parse_size
+        if decoy:
+            safe_operations.handle_invalid_password(
+                archive_size, os.path.join(output_path, Def_val.decoy_name), parse_size(Def_val.decoy_size))
         else:
-            self.encrypt_archive(encrypt_config)
+            aes.logging.error(Msg.Err.wrong_pass)
+
+    def layer_range(self, password: str) -> tuple[int, int] | None:
+        offset = len(password) * self.block_size
+        passwd_offset = header.calculate_offset(password, 1024)
+        header_size = passwd_offset + header.data_size
+        ok, archive_size = header.read(
+            self.container_path, offset, passwd_offset, self.get_schedule(password).header_iv, self.buffer_size, self.disk_mode)
+        if not ok:
+            return None
+        return offset, offset + header_size + archive_size
+
+    def open_layer(self, password: str, output_path: str = ".", decoy: bool = Def_val.decoy) -> aes.DecryptReader | None:
+        if not os.path.exists(self.container_path):
+            aes.logging.error(Msg.Warn.container_doesnt_exist)
+            return None
+
+        offset = len(password) * self.block_size
+        passwd_offset = header.calculate_offset(password, 1024)
+        header_size = passwd_offset + header.data_size
+        schedule = self.get_schedule(password)
+
+        ok, archive_size = header.read(
+            self.container_path, offset, passwd_offset, schedule.header_iv, self.buffer_size, self.disk_mode)
+        if not ok:
+            self.reject_password(archive_size, output_path, decoy)
+            return None
+
+        start_pos = offset + header_size
+        end_pos = start_pos + archive_size
+        aes_obj = aes.Aes(self.buffer_size, self.disk_mode)
+        return aes_obj.open_reader(self.container_path, password,
+                                   start_pos, end_pos, schedule)
+
+    def store_generation(self, encrypt_config) -> dict | None:
+        # Keeps the layer just written as a new generation of the chunk store
+        # named in its section; the store is sealed with the layer password.
+        password = encrypt_config['password']
+        reader = self.open_layer(password)
+        if reader is None:
+            return None
+        store = chunk_store.ChunkStore(encrypt_config["chunk_store"], password)
+        with reader:
+            return store.put_generation(time.strftime(Def_val.generation_name), reader)
+
+    def extract_archive(self, output_path: str, password: str, pattern: str, decoy: bool = Def_val.decoy) -> int:
+        reader = self.open_layer(password, output_path, decoy)
+        if reader is None:
+            return 0
+        with reader:
+            count = zip.extract_stream(reader, output_path, pattern)
+            logging.info(Msg.Info.extracted_matching(
+                count, pattern, reader.bytes_read))
+        return count
+
+    def list_archive(self, password: str, output_path: str = ".", decoy: bool = Def_val.decoy) -> list:
+        reader = self.open_layer(password, output_path, decoy)
+        if reader is None:
+            return []
+        with reader:
+            entries = zip.list_stream(reader)
+            for line in zip.format_listing(entries):
+                print(line)
+            logging.info(Msg.Info.listed_archive(
+                len(entries), reader.bytes_read))
+        return entries
+
+    def worker_conf(self, passwords=()) -> dict:
+        # settings for a Core in a layer worker process; inner AES stays
+        # single-process so the I/O streams are capped by layer_workers.
+        # The key schedules of its passwords go along, so the worker does
+        # not run PBKDF2 again.
+        return {
+            "container_path": self.container_path,
+            "block_size": f"{self.block_size}b",
+            "buffer_size": f"{self.buffer_size}b",
+            "workers": 1,
+            "pipeline": self.pipeline,
+            "fused_write": self.fused_write,
+            "hash_algorithm": self.hash_algorithm,
+            "hash_threads": self.hash_threads,
+            "zip_workers": 1,
+            "schedules": {password: self.get_schedule(password) for password in passwords},
+        }
+
+    def encrypt_layers_parallel(self, encrypt_configs) -> list[tuple[int, int] | None] | None:
+        from utils.data_utils import parse_size
+        if self.noise_pending():
+            self.create_noise()
+
+        extents = layers.plan(encrypt_configs, self.block_size, parse_size)
+        overlapping = layers.conflicts(extents, self.get_container_size())
+        if overlapping:
+            logging.warning(Msg.Warn.layers_overlap(overlapping))
+            return None
+
+        workers = layers.worker_count(self.layer_workers, len(extents),
+                                      self.buffer_size, parse_size(self.layer_memory))
+        logging.info(Msg.Info.encrypting_layers_in_parallel(len(extents), workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(layers.encrypt_layer, os.path.abspath(__file__),
+                                   self.worker_conf([encrypt_conf['password']]), self.disk_mode, encrypt_conf)
+                       for encrypt_conf in encrypt_configs]
+            return [future.result() for future in futures]
+
+    def decrypt_layers_parallel(self, output_path: str, passwords, decoy: bool = Def_val.decoy) -> None:
+        # Layers are always streamed read-only here. Every layer goes into its
+        # own subdirectory, which is merged into output_path afterwards
+        # unless layer_output is "subdirs".
+        if not os.path.exists(self.container_path):
+            aes.logging.error(Msg.Warn.container_doesnt_exist)
+            return
+
+        order = sorted(range(len(passwords)),
+                       key=lambda index: len(passwords[index]))
+        names = {index: f"layer{index + 1}" for index in order}
+        prefix = "" if self.layer_output == "subdirs" else "."
+        jobs = [(os.path.join(output_path, prefix + names[index]), passwords[index])
+                for index in order]
+
+        total = 0
+        for password in passwords:
+            extent = self.layer_range(password)
+            if extent is not None:
+                total += extent[1] - extent[0]
+
+        groups = layers.group_by_offset(jobs, min(self.decrypt_workers, len(jobs)))
+        logging.info(Msg.Info.decrypting_layers_in_parallel(len(jobs), len(groups)))
+        with multiprocessing.Manager() as manager:
+            progress_queue = manager.Queue()
+            with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+                futures = [pool.submit(layers.decrypt_layers, os.path.abspath(__file__),
+                                       self.worker_conf([password for _, password in group]),
+                                       self.disk_mode, group, decoy, progress_queue)
+                           for group in groups]
+                with aes.tqdm(total=total, desc=Msg.PBar.decrypting_layers, unit="B", unit_scale=True) as pbar:
+                    while not all(future.done() for future in futures) or not progress_queue.empty():
+                        try:
+                            pbar.update(progress_queue.get(timeout=0.1))
+                        except queue.Empty:
+                            pass
+                for future in futures:
+                    future.result()
+
+        if self.layer_output != "subdirs":
+            for position, index in enumerate(order):
+                for renamed in layers.merge_output(jobs[position][0], output_path, names[index]):
+                    logging.warning(Msg.Warn.merged_file_renamed(renamed))
+
+    def encrypt_container(self, encrypt_config) -> None:
+        encrypt_configs = encrypt_config if isinstance(
+            encrypt_config, list) else [encrypt_config]
+        passwords = [encrypt_conf['password'] for encrypt_conf in encrypt_configs]
+        if len(encrypt_configs) > 1:
+            self.prepare_keys(passwords)
+        changed_ranges = None
+        if self.layer_workers > 1 and len(encrypt_configs) > 1:
+            changed_ranges = self.encrypt_layers_parallel(encrypt_configs)
+        if changed_ranges is None:
+            changed_ranges = [self.encrypt_archive(encrypt_conf)
+                              for encrypt_conf in encrypt_configs]
+        for index, encrypt_conf in enumerate(encrypt_configs):
+            if encrypt_conf.get("chunk_store", Def_val.chunk_store) and changed_ranges[index] is not None:
+                self.store_generation(encrypt_conf)
+        if None in changed_ranges:
+            # an aborted layer left bytes the manifest cannot account for
+            return
+
+        current = self.check_manifest(passwords, changed_ranges)
+        if current is not None:
+            manifest.save(current, self.manifest_path, passwords[0])
+            logging.info(Msg.Info.manifest_saved(self.manifest_path))
 
     def decrypt_container(self, output_path: str, decrypt_config, password) -> None:
         from utils.data_utils import parse_size
@@ -285,16 +640,43 @@ class Core:
         if "hashsum_limit" in decrypt_config:
             hashsum_limit = parse_size(decrypt_config["hashsum_limit"])
 
-        old_hashsum = self.get_hashsum(
-            0, hashsum_limit)
-
-        if isinstance(password, list):
-            for passwd in password:
-                self.decrypt_archive(output_path, passwd)
-        else:
-            self.decrypt_archive(output_path, password)
+        readonly = decrypt_config.get("readonly", Def_val.readonly)
+        pattern = decrypt_config.get("pattern")
+        decoy = decrypt_config.get("decoy", Def_val.decoy)
+
+        listing = decrypt_config.get("list", False)
+        in_place = not (listing or pattern or readonly)
+
+        passwords = password if isinstance(password, list) else [password]
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            # The "before" hash runs in the background; an in-place decrypt
+            # waits for it only when its layer overlaps the hashed range.
+            old_future = pool.submit(self.get_hashsum, 0, hashsum_limit)
+            self.prepare_keys(passwords)
+            parallel = not (listing or pattern) and self.decrypt_workers > 1 and len(passwords) > 1
+            if parallel:
+                # read-only streaming never writes the container, so it can
+                # overlap the "before" hash regardless of layer positions
+                self.decrypt_layers_parallel(output_path, passwords, decoy)
+            for passwd in passwords if not parallel else []:
+                if listing:
+                    self.list_archive(passwd, output_path, decoy)
+                elif pattern:
+                    self.extract_archive(output_path, passwd, pattern, decoy)
+                else:
+                    if in_place and hashsum_limit and os.path.exists(self.container_path):
+                        extent = self.layer_range(passwd)
+                        if extent is not None and extent[0] < hashsum_limit:
+                            old_future.result()
+                    self.decrypt_archive(output_path, passwd, readonly, decoy)
+            old_hashsum = old_future.result()
 
         new_hashsum = self.get_hashsum(0, hashsum_limit)
 
         if old_hashsum is not None and new_hashsum is not None:
             self.check_integrality(old_hashsum, new_hashsum, "Container")
+
+        # decryption leaves the container as it was, so there is nothing to
+        # bring up to date and the full pass only runs when asked for
+        if self.manifest_verify:
+            self.check_manifest(passwords)
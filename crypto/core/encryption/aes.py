@@ -1,5 +1,7 @@
 import os
 import secrets
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from tqdm import tqdm
@@ -54,90 +56,290 @@ def decrypt_data(encrypted_data: bytes, key: bytes, iv: bytes) -> bytes:
     
     return decrypted_data
 
+class StreamEncryptor:
+    """
+    Потоковый шифратор AES-256-CBC с одним контекстом на весь поток.
+    Данные можно подавать кусками любого размера, паддинг PKCS7 добавляется
+    только в finalize()
+    """
+
+    def __init__(self, key: bytes, iv: bytes):
+        cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+        self._encryptor = cipher.encryptor()
+        self._total = 0
+
+    def update_into(self, data, out: bytearray) -> int:
+        """
+        Шифрует кусок данных в заранее выделенный буфер
+
+        Args:
+            data: Открытые данные
+            out: Буфер размером не меньше len(data) + 15
+
+        Returns:
+            int: Количество записанных в out байт
+        """
+        self._total += len(data)
+        return self._encryptor.update_into(data, out)
+
+    def update(self, data) -> bytes:
+        """
+        Шифрует кусок данных
+
+        Args:
+            data: Открытые данные
+
+        Returns:
+            bytes: Зашифрованные полные блоки
+        """
+        self._total += len(data)
+        return self._encryptor.update(data)
+
+    def finalize(self) -> bytes:
+        """
+        Добавляет паддинг PKCS7 и завершает шифрование
+
+        Returns:
+            bytes: Последние зашифрованные блоки
+        """
+        pad = 16 - self._total % 16
+        return self._encryptor.update(bytes([pad] * pad)) + self._encryptor.finalize()
+
+
+class StreamDecryptor:
+    """
+    Потоковый дешифратор AES-256-CBC с одним контекстом на весь поток.
+    Последний блок удерживается до finalize(), где снимается паддинг PKCS7
+    """
+
+    def __init__(self, key: bytes, iv: bytes):
+        cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+        self._decryptor = cipher.decryptor()
+        self._held = bytearray(16)
+        self._held_view = memoryview(self._held)
+        self._held_size = 0
+
+    def update_into(self, data, out: bytearray) -> int:
+        """
+        Дешифрует кусок данных в заранее выделенный буфер
+
+        Удерживаемый блок ставится в начало out, за ним дешифруется data,
+        а последний блок снова уходит в удерживаемый, поэтому новых буферов
+        не создаётся
+
+        Args:
+            data: Зашифрованные данные
+            out: Буфер размером не меньше len(data) + 31
+
+        Returns:
+            int: Количество готовых открытых байт в начале out
+        """
+        out_view = memoryview(out)
+        out_view[:self._held_size] = self._held_view[:self._held_size]
+        size = self._held_size + self._decryptor.update_into(data, out_view[self._held_size:])
+        if size < 16:
+            return 0
+        self._held_view[:] = out_view[size - 16:size]
+        self._held_size = 16
+        return size - 16
+
+    def update(self, data) -> bytes:
+        """
+        Дешифрует кусок данных
+
+        Args:
+            data: Зашифрованные данные
+
+        Returns:
+            bytes: Готовые открытые данные
+        """
+        out = bytearray(len(data) + 31)
+        return bytes(out[:self.update_into(data, out)])
+
+    def finalize(self) -> bytes:
+        """
+        Завершает дешифрование и снимает паддинг PKCS7
+
+        Returns:
+            bytes: Последние открытые данные
+
+        Raises:
+            ValueError: Если данные повреждены или ключ неверный
+        """
+        self._decryptor.finalize()
+        unpadder = padding.PKCS7(128).unpadder()
+        return unpadder.update(bytes(self._held[:self._held_size])) + unpadder.finalize()
+
+
 def encrypt_file(input_file: str, output_file: str, key: bytes, iv: bytes, buffer_size: int = 1024 * 1024) -> bool:
     """
-    Шифрует файл с помощью AES-256-CBC
-    
+    Шифрует файл с помощью AES-256-CBC одним потоком с паддингом только в конце
+
     Args:
         input_file: Путь к входному файлу
         output_file: Путь к выходному файлу
         key: Ключ шифрования (256 бит)
         iv: Вектор инициализации (128 бит)
         buffer_size: Размер буфера для чтения
-        
+
     Returns:
         bool: True если операция успешна, иначе False
     """
     try:
         file_size = os.path.getsize(input_file)
-        
+        encryptor = StreamEncryptor(key, iv)
+        buffer = bytearray(buffer_size)
+        out = bytearray(buffer_size + 15)
+        view = memoryview(buffer)
+        out_view = memoryview(out)
+
         with open(input_file, 'rb') as in_file, open(output_file, 'wb') as out_file:
-            with tqdm(total=100, desc=Msg.PBar.encrypting_file, unit="%", unit_scale=False) as pbar:
-                position = 0
-                
-                while position < file_size:
-                    chunk = in_file.read(buffer_size)
-                    if not chunk:
+            with tqdm(total=file_size, desc=Msg.PBar.encrypting_file, unit="B", unit_scale=True) as pbar:
+                while True:
+                    read = in_file.readinto(buffer)
+                    if not read:
                         break
-                        
-                    encrypted_chunk = encrypt_data(chunk, key, iv)
-                    out_file.write(encrypted_chunk)
-                    
-                    position += len(chunk)
-                    progress_pct = min(position / file_size * 100, 100)
-                    pbar.update(progress_pct - pbar.n)
-                    
-                    # Обновляем IV для следующего блока (для режима CBC)
-                    iv = encrypted_chunk[-16:]
-                    
+                    written = encryptor.update_into(view[:read], out)
+                    out_file.write(out_view[:written])
+                    pbar.update(read)
+                out_file.write(encryptor.finalize())
+
         return True
     except Exception as e:
         logging.error(f"Ошибка при шифровании файла: {e}")
         return False
 
+
 def decrypt_file(input_file: str, output_file: str, key: bytes, iv: bytes, buffer_size: int = 1024 * 1024) -> bool:
     """
-    Дешифрует файл с помощью AES-256-CBC
-    
+    Дешифрует файл, зашифрованный encrypt_file
+
     Args:
         input_file: Путь к входному файлу
         output_file: Путь к выходному файлу
         key: Ключ шифрования (256 бит)
         iv: Вектор инициализации (128 бит)
         buffer_size: Размер буфера для чтения
-        
+
     Returns:
         bool: True если операция успешна, иначе False
     """
     try:
         file_size = os.path.getsize(input_file)
-        
+        decryptor = StreamDecryptor(key, iv)
+        buffer = bytearray(buffer_size)
+        out = bytearray(buffer_size + 31)
+        view = memoryview(buffer)
+        out_view = memoryview(out)
+
         with open(input_file, 'rb') as in_file, open(output_file, 'wb') as out_file:
-            with tqdm(total=100, desc=Msg.PBar.decrypting_file, unit="%", unit_scale=False) as pbar:
-                position = 0
-                prev_encrypted_chunk = None
-                
-                while position < file_size:
-                    chunk = in_file.read(buffer_size)
-                    if not chunk:
+            with tqdm(total=file_size, desc=Msg.PBar.decrypting_file, unit="B", unit_scale=True) as pbar:
+                while True:
+                    read = in_file.readinto(buffer)
+                    if not read:
                         break
-                        
-                    decrypted_chunk = decrypt_data(chunk, key, iv)
-                    out_file.write(decrypted_chunk)
-                    
-                    position += len(chunk)
-                    progress_pct = min(position / file_size * 100, 100)
-                    pbar.update(progress_pct - pbar.n)
-                    
-                    # Сохраняем IV для следующего блока (для режима CBC)
-                    iv = chunk[-16:]
-                    prev_encrypted_chunk = chunk
-                    
+                    written = decryptor.update_into(view[:read], out)
+                    out_file.write(out_view[:written])
+                    pbar.update(read)
+                out_file.write(decryptor.finalize())
+
         return True
     except Exception as e:
         logging.error(f"Ошибка при дешифровании файла: {e}")
         return False
 
+
+def ctr_cipher(key: bytes, nonce: bytes, offset: int) -> Cipher:
+    """
+    Создаёт AES-CTR, начинающийся с позиции offset в потоке
+
+    Args:
+        key: Ключ шифрования (256 бит)
+        nonce: Начальное значение счётчика (128 бит)
+        offset: Позиция в потоке, кратная 16
+
+    Returns:
+        Cipher: Объект шифра
+    """
+    counter = (int.from_bytes(nonce, 'big') + offset // 16) % (1 << 128)
+    return Cipher(algorithms.AES(key), modes.CTR(counter.to_bytes(16, 'big')), backend=default_backend())
+
+
+def _ctr_chunk(input_file: str, output_file: str, key: bytes, nonce: bytes, offset: int, size: int) -> int:
+    with open(input_file, 'rb') as in_file, open(output_file, 'r+b') as out_file:
+        in_file.seek(offset)
+        data = in_file.read(size)
+        out_file.seek(offset)
+        out_file.write(ctr_cipher(key, nonce, offset).encryptor().update(data))
+    return len(data)
+
+
+def crypt_file_parallel(input_file: str, output_file: str, key: bytes, nonce: bytes, buffer_size: int = 1024 * 1024, workers: int = None) -> bool:
+    """
+    Шифрует или дешифрует файл AES-256-CTR параллельно.
+    Каждый кусок обрабатывается независимо, поэтому шифрование и дешифрование
+    совпадают, размер файла не меняется, а любой диапазон читается через read_range
+
+    CTR не проверяет целостность: изменённый байт шифротекста незаметно
+    меняет тот же байт открытых данных. Nonce передаётся вызывающим и должен
+    быть уникальным для каждого файла, зашифрованного этим ключом (например
+    generate_iv()); повторный nonce раскрывает XOR двух открытых текстов.
+    Для дешифрования нужен тот же nonce, его хранят рядом с файлом
+
+    Args:
+        input_file: Путь к входному файлу
+        output_file: Путь к выходному файлу
+        key: Ключ шифрования (256 бит)
+        nonce: Уникальное для ключа начальное значение счётчика (128 бит)
+        buffer_size: Размер куска, кратный 16
+        workers: Количество потоков (по умолчанию число ядер)
+
+    Returns:
+        bool: True если операция успешна, иначе False
+    """
+    if buffer_size % 16:
+        logging.error(f"Размер буфера должен быть кратен 16: {buffer_size}")
+        return False
+    try:
+        file_size = os.path.getsize(input_file)
+        with open(output_file, 'wb') as out_file:
+            out_file.truncate(file_size)
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = [pool.submit(_ctr_chunk, input_file, output_file, key, nonce, offset, buffer_size)
+                       for offset in range(0, file_size, buffer_size)]
+            with tqdm(total=file_size, desc=Msg.PBar.encrypting_file, unit="B", unit_scale=True) as pbar:
+                for future in as_completed(futures):
+                    pbar.update(future.result())
+
+        return True
+    except Exception as e:
+        logging.error(f"Ошибка при параллельном шифровании файла: {e}")
+        return False
+
+
+def read_range(input_file: str, key: bytes, nonce: bytes, offset: int, size: int) -> bytes:
+    """
+    Дешифрует произвольный диапазон файла, зашифрованного crypt_file_parallel
+
+    Args:
+        input_file: Путь к зашифрованному файлу
+        key: Ключ шифрования (256 бит)
+        nonce: Начальное значение счётчика (128 бит)
+        offset: Начало диапазона
+        size: Длина диапазона
+
+    Returns:
+        bytes: Открытые данные диапазона
+    """
+    aligned = offset - offset % 16
+    with open(input_file, 'rb') as in_file:
+        in_file.seek(aligned)
+        data = in_file.read(size + offset - aligned)
+    plain = ctr_cipher(key, nonce, aligned).decryptor().update(data)
+    return plain[offset - aligned:]
+
+
 def generate_iv(size: int = 16) -> bytes:
     """
     Генерирует случайный вектор инициализации
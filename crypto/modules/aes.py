@@ -1,4 +1,8 @@
 import io
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
@@ -16,15 +20,171 @@ class Mode(Enum):
     Decrypt = 2
 
 
+def _process_units(file_path: str, buffer_size: int, disk_mode: bool, xts_key: bytes, iv: bytes, mode, units) -> int:
+    # Every update() is a separate XTS data unit with the same tweak, so a
+    # fresh context per worker produces the same bytes as the serial loop.
+    cipher = Cipher(algorithms.AES(xts_key), modes.XTS(iv),
+                    backend=default_backend())
+    context = cipher.encryptor() if mode == Mode.Encrypt else cipher.decryptor()
+    processed = 0
+
+    if not disk_mode:
+        with open(file_path, 'r+b') as f:
+            for offset, size in units:
+                f.seek(offset)
+                block = f.read(size)
+                if not block:
+                    break
+                f.seek(offset)
+                f.write(context.update(block))
+                processed += len(block)
+    else:
+        handle = winDiskHandler.DiskHandler(file_path, buffer_size)
+        try:
+            for offset, size in units:
+                block = handle.read_data(offset, size)
+                if not block:
+                    break
+                processed_block = context.update(block)
+                if offset % buffer_size == 0 and size % handle.SECTOR_SIZE == 0:
+                    handle.write_aligned_data(offset, processed_block)
+                else:
+                    handle.write_data(offset, processed_block)
+                processed += len(block)
+        finally:
+            handle.close_disk()
+    return processed
+
+
+def _write_at(f, fd: int, offset: int, data) -> None:
+    if hasattr(os, "pwrite"):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+    else:
+        f.seek(offset)
+        f.write(data)
+
+
+class DecryptReader(io.RawIOBase):
+    # Read-only, seekable view of the plaintext of [start_pos, end_pos).
+    # Only the data units that are actually read get decrypted; the
+    # container itself is never written.
+    def __init__(self, aes_obj, file_path: str, start_pos: int, end_pos: int) -> None:
+        super().__init__()
+        self.aes = aes_obj
+        self.start_pos = start_pos
+        self.size = end_pos - start_pos
+        # unit boundaries match data_units(), computed on demand so opening
+        # a large layer does not enumerate all of its units
+        self.first_unit = aes_obj.buffer_size
+        if aes_obj.disk_mode and start_pos % aes_obj.buffer_size:
+            self.first_unit = aes_obj.buffer_size - start_pos % aes_obj.buffer_size
+        self.position = 0
+        self.cached_index = None
+        self.cached_block = b""
+        self.bytes_read = 0
+        # optional callback receiving the size of every decrypted unit
+        self.progress = None
+        if aes_obj.disk_mode:
+            self.handle = winDiskHandler.DiskHandler(
+                file_path, aes_obj.buffer_size)
+            self.file = None
+        else:
+            self.handle = None
+            self.file = open(file_path, 'rb')
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if self.position < 0:
+            raise ValueError(f"negative seek position {self.position}")
+        return self.position
+
+    def _unit_index(self, position: int) -> int:
+        if position < self.first_unit:
+            return 0
+        return 1 + (position - self.first_unit) // self.aes.buffer_size
+
+    def _unit_start(self, index: int) -> int:
+        if index == 0:
+            return 0
+        return self.first_unit + (index - 1) * self.aes.buffer_size
+
+    def _load_unit(self, index: int) -> bytes:
+        if index != self.cached_index:
+            start = self._unit_start(index)
+            length = self.first_unit if index == 0 else self.aes.buffer_size
+            offset = self.start_pos + start
+            size = min(length, self.size - start)
+            if self.file is not None:
+                self.file.seek(offset)
+                block = self.file.read(size)
+            else:
+                block = self.handle.read_data(offset, size)
+            self.bytes_read += len(block)
+            if self.progress is not None:
+                self.progress(len(block))
+            self.cached_block = self.aes.cipher.decryptor().update(block)
+            self.cached_index = index
+        return self.cached_block
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size:
+            return 0
+        view = memoryview(buffer).cast("B")
+        to_read = min(len(view), self.size - self.position)
+        done = 0
+        while done < to_read:
+            index = self._unit_index(self.position)
+            block = self._load_unit(index)
+            inner = self.position - self._unit_start(index)
+            chunk = min(to_read - done, len(block) - inner)
+            if chunk <= 0:
+                break
+            view[done:done + chunk] = block[inner:inner + chunk]
+            done += chunk
+            self.position += chunk
+        return done
+
+    def close(self) -> None:
+        if not self.closed:
+            if self.file is not None:
+                self.file.close()
+            if self.handle is not None:
+                self.handle.close_disk()
+        super().close()
+
+
 class Aes:
     key_iterations = 10000
     iv_iterations = 25000
     key_size = 64
     iv_size = 16
+    units_per_task = 16
+    queue_depth = 4
 
-    def __init__(self, buffer_size: int = 128*1024, disk_mode: bool = False) -> None:
+    def __init__(self, buffer_size: int = 128*1024, disk_mode: bool = False, workers: int = 1, pipeline: bool = False) -> None:
         self.buffer_size = buffer_size
         self.disk_mode = disk_mode
+        self.workers = max(1, workers)
+        self.pipeline = pipeline
 
     def _derive_key_and_iv(self, password: str, key_iterations: int, iv_iterations: int, key_size: int, iv_size: int):
         backend = default_backend()
@@ -46,16 +206,32 @@ class Aes:
         iv = kdf_iv.derive(password.encode())
         return key, iv
 
-    def process_file_part(self, file_path: str, password: str, start_pos: int, end_pos: int, mode) -> None:
-        key, iv = self._derive_key_and_iv(
-            password, self.key_iterations, self.iv_iterations, self.key_size, self.iv_size)
-        key1 = key[:32]
-        key2 = key[32:]
+    def init_cipher(self, password: str, schedule=None) -> tuple[bytes, bytes]:
+        if schedule is not None:
+            xts_key, iv = schedule.xts_key, schedule.iv
+        else:
+            key, iv = self._derive_key_and_iv(
+                password, self.key_iterations, self.iv_iterations, self.key_size, self.iv_size)
+            key1 = key[:32]
+            key2 = key[32:]
 
-        xts_key = key1 + key2
+            xts_key = key1 + key2
 
         self.cipher = Cipher(algorithms.AES(xts_key), modes.XTS(iv),
                              backend=default_backend())
+        return xts_key, iv
+
+    def process_file_part(self, file_path: str, password: str, start_pos: int, end_pos: int, mode, schedule=None) -> None:
+        xts_key, iv = self.init_cipher(password, schedule)
+
+        if self.workers > 1 and mode in (Mode.Encrypt, Mode.Decrypt):
+            self._process_parallel(file_path, xts_key, iv,
+                                   start_pos, end_pos, mode)
+            return
+
+        if self.pipeline and mode in (Mode.Encrypt, Mode.Decrypt):
+            self._process_pipelined(file_path, start_pos, end_pos, mode)
+            return
 
         match mode:
             case Mode.Encrypt:
@@ -65,34 +241,237 @@ class Aes:
             case _:
                 logging.error(f"unknown mode [{mode}]")
 
-    def _encrypt(self, file_path: str, start_pos: int, end_pos: int) -> None:
+    def open_reader(self, file_path: str, password: str, start_pos: int, end_pos: int, schedule=None) -> DecryptReader:
+        self.init_cipher(password, schedule)
+        return DecryptReader(self, file_path, start_pos, end_pos)
+
+    def write_encrypted(self, file_path: str, source, start_pos: int, size: int) -> int:
+        # Encrypts plaintext from source while it is copied into the container,
+        # unit by unit, so the result equals a copy followed by _encrypt().
         encryptor = self.cipher.encryptor()
+        in_buffer = bytearray(self.buffer_size)
+        out_buffer = bytearray(self.buffer_size + 15)
+        in_view = memoryview(in_buffer)
+        out_view = memoryview(out_buffer)
+        bytes_written = 0
+
+        def read_unit(unit_size):
+            read_size = 0
+            while read_size < unit_size:
+                n = source.readinto(in_view[read_size:unit_size])
+                if not n:
+                    break
+                read_size += n
+            return read_size
+
+        with tqdm(total=size, desc=Msg.PBar.uploading_archive_to_disk, unit="B", unit_scale=True) as pbar:
+            if not self.disk_mode:
+                with open(file_path, 'r+b', buffering=0) as f:
+                    fd = f.fileno()
+                    for offset, unit_size in self.data_units(start_pos, start_pos + size):
+                        read_size = read_unit(unit_size)
+                        if not read_size:
+                            break
+                        written = encryptor.update_into(
+                            in_view[:read_size], out_buffer)
+                        _write_at(f, fd, offset, out_view[:written])
+                        bytes_written += read_size
+                        pbar.update(read_size)
+            else:
+                handle = winDiskHandler.DiskHandler(
+                    file_path, self.buffer_size)
+                try:
+                    for offset, unit_size in self.data_units(start_pos, start_pos + size):
+                        read_size = read_unit(unit_size)
+                        if not read_size:
+                            break
+                        encrypted_block = encryptor.update(
+                            in_view[:read_size])
+                        if offset % self.buffer_size == 0 and read_size % handle.SECTOR_SIZE == 0:
+                            handle.write_aligned_data(offset, encrypted_block)
+                        else:
+                            handle.write_data(offset, encrypted_block)
+                        bytes_written += read_size
+                        pbar.update(read_size)
+                finally:
+                    handle.close_disk()
+            encryptor.finalize()
+        return bytes_written
+
+    def data_units(self, start_pos: int, end_pos: int) -> list[tuple[int, int]]:
+        # Same block boundaries as the serial loops: in disk mode the first
+        # unit only runs up to the next buffer-aligned offset.
+        units = []
+        current_offset = start_pos
+        if self.disk_mode and start_pos % self.buffer_size and end_pos > start_pos:
+            align_read_size = self.buffer_size - start_pos % self.buffer_size
+            size = min(align_read_size, end_pos - start_pos)
+            units.append((current_offset, size))
+            current_offset += size
+
+        while current_offset < end_pos:
+            size = min(self.buffer_size, end_pos - current_offset)
+            units.append((current_offset, size))
+            current_offset += size
+        return units
+
+    def _process_parallel(self, file_path: str, xts_key: bytes, iv: bytes, start_pos: int, end_pos: int, mode) -> None:
+        units = self.data_units(start_pos, end_pos)
+        step = self.units_per_task
+        tasks = [units[i:i + step] for i in range(0, len(units), step)]
+        desc = Msg.PBar.encrypting_part if mode == Mode.Encrypt else Msg.PBar.decrypting_part
+
+        with tqdm(total=end_pos - start_pos, desc=desc, unit="B", unit_scale=True) as pbar:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(_process_units, file_path, self.buffer_size, self.disk_mode,
+                                           xts_key, iv, mode, task) for task in tasks]
+                for future in as_completed(futures):
+                    pbar.update(future.result())
+
+    def _process_pipelined(self, file_path: str, start_pos: int, end_pos: int, mode) -> None:
+        # reader thread -> cipher (this thread) -> writer thread; the bounded
+        # queues keep at most queue_depth blocks in flight on each side.
+        units = self.data_units(start_pos, end_pos)
+        context = self.cipher.encryptor() if mode == Mode.Encrypt else self.cipher.decryptor()
+        desc = Msg.PBar.encrypting_part if mode == Mode.Encrypt else Msg.PBar.decrypting_part
+        read_queue = queue.Queue(maxsize=self.queue_depth)
+        write_queue = queue.Queue(maxsize=self.queue_depth)
+        abort = threading.Event()
+        consumer_done = threading.Event()
+        errors = []
+
+        def put(q, item):
+            while not consumer_done.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def reader():
+            try:
+                if not self.disk_mode:
+                    with open(file_path, 'rb') as f:
+                        for offset, size in units:
+                            if abort.is_set():
+                                break
+                            f.seek(offset)
+                            block = f.read(size)
+                            if not block:
+                                break
+                            put(read_queue, (offset, block))
+                else:
+                    handle = winDiskHandler.DiskHandler(
+                        file_path, self.buffer_size)
+                    try:
+                        for offset, size in units:
+                            if abort.is_set():
+                                break
+                            block = handle.read_data(offset, size)
+                            if not block:
+                                break
+                            put(read_queue, (offset, block))
+                    finally:
+                        handle.close_disk()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                put(read_queue, None)
+
+        def writer(pbar):
+            try:
+                if not self.disk_mode:
+                    with open(file_path, 'r+b') as f:
+                        while (item := write_queue.get()) is not None:
+                            offset, block = item
+                            f.seek(offset)
+                            f.write(block)
+                            pbar.update(len(block))
+                else:
+                    handle = winDiskHandler.DiskHandler(
+                        file_path, self.buffer_size)
+                    try:
+                        while (item := write_queue.get()) is not None:
+                            offset, block = item
+                            if offset % self.buffer_size == 0 and len(block) % handle.SECTOR_SIZE == 0:
+                                handle.write_aligned_data(offset, block)
+                            else:
+                                handle.write_data(offset, block)
+                            pbar.update(len(block))
+                    finally:
+                        handle.close_disk()
+            except Exception as e:
+                errors.append(e)
+                abort.set()
+                # keep draining so the cipher stage never blocks on a full queue
+                while write_queue.get() is not None:
+                    pass
+
+        with tqdm(total=end_pos - start_pos, desc=desc, unit="B", unit_scale=True) as pbar:
+            read_thread = threading.Thread(target=reader, daemon=True)
+            write_thread = threading.Thread(
+                target=writer, args=(pbar,), daemon=True)
+            read_thread.start()
+            write_thread.start()
+            try:
+                while (item := read_queue.get()) is not None:
+                    offset, block = item
+                    write_queue.put((offset, context.update(block)))
+            except Exception as e:
+                errors.append(e)
+                abort.set()
+            finally:
+                consumer_done.set()
+                write_queue.put(None)
+                write_thread.join()
+                read_thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def _process_file(self, file_path: str, start_pos: int, end_pos: int, context, desc: str) -> None:
+        # Steady state allocates nothing: both buffers are reused for every
+        # block, data is read with readinto() and transformed with update_into().
         total_size = end_pos - start_pos
+        in_buffer = bytearray(self.buffer_size)
+        out_buffer = bytearray(self.buffer_size + 15)
+        in_view = memoryview(in_buffer)
+        out_view = memoryview(out_buffer)
 
-        if not self.disk_mode:
-            with open(file_path, 'r+b') as f:
-                f.seek(start_pos)
-                remaining_size = total_size
+        with open(file_path, 'r+b', buffering=0) as f:
+            fd = f.fileno()
+            current_offset = start_pos
+            remaining_size = total_size
 
-                with tqdm(total=total_size, desc=Msg.PBar.encrypting_part, unit="B", unit_scale=True) as pbar:
-                    while remaining_size > 0:
-                        to_read = min(self.buffer_size, remaining_size)
-                        file_block = f.read(to_read)
+            with tqdm(total=total_size, desc=desc, unit="B", unit_scale=True) as pbar:
+                while remaining_size > 0:
+                    to_read = min(self.buffer_size, remaining_size)
+                    f.seek(current_offset)
+                    read_size = f.readinto(in_view[:to_read])
 
-                        if not file_block:
-                            break
+                    if not read_size:
+                        break
 
-                        encrypted_block = encryptor.update(file_block)
+                    written = context.update_into(
+                        in_view[:read_size], out_buffer)
+                    _write_at(f, fd, current_offset, out_view[:written])
 
-                        f.seek(-len(file_block), io.SEEK_CUR)
-                        f.write(encrypted_block)
+                    current_offset += read_size
+                    remaining_size -= read_size
+                    pbar.update(read_size)
 
-                        remaining_size -= len(file_block)
-                        pbar.update(len(file_block))
+                final_block = context.finalize()
+                if final_block:
+                    _write_at(f, fd, current_offset, final_block)
+                pbar.update(len(final_block))
+
+    def _encrypt(self, file_path: str, start_pos: int, end_pos: int) -> None:
+        encryptor = self.cipher.encryptor()
+        total_size = end_pos - start_pos
 
-                    final_block = encryptor.finalize()
-                    f.write(final_block)
-                    pbar.update(len(final_block))
+        if not self.disk_mode:
+            self._process_file(file_path, start_pos, end_pos,
+                               encryptor, Msg.PBar.encrypting_part)
         else:
             handle = winDiskHandler.DiskHandler(file_path, self.buffer_size)
             current_offset = start_pos
@@ -151,82 +530,61 @@ class Aes:
     def _decrypt(self, file_path: str, start_pos: int, end_pos: int) -> None:
         decryptor = self.cipher.decryptor()
         total_size = end_pos - start_pos
-        with open(file_path, 'r+b') as f:
+        if not self.disk_mode:
+            self._process_file(file_path, start_pos, end_pos,
+                               decryptor, Msg.PBar.decrypting_part)
+        else:
+            handle = winDiskHandler.DiskHandler(
+                file_path, self.buffer_size)
+            current_offset = start_pos
             remaining_size = total_size
 
-            if not self.disk_mode:
-                f.seek(start_pos)
-                with tqdm(total=total_size, desc=Msg.PBar.decrypting_part, unit="B", unit_scale=True) as pbar:
-                    while remaining_size > 0:
-                        to_read = min(self.buffer_size, remaining_size)
-                        encrypted_block = f.read(to_read)
-
-                        if not encrypted_block:
-                            break
+            def align_data(pbar, handle):
+                nonlocal remaining_size, current_offset
 
-                        decrypted_block = decryptor.update(encrypted_block)
+                start_A_pos = sec_size * (start_pos // sec_size)
+                end_A_pos = start_A_pos + sec_size
+                align_read_size = end_A_pos - start_pos
 
-                        f.seek(-len(encrypted_block), io.SEEK_CUR)
-                        f.write(decrypted_block)
+                to_read = min(remaining_size, align_read_size)
+                encrypted_block = handle.read_data(current_offset, to_read)
 
-                        remaining_size -= len(decrypted_block)
-                        pbar.update(len(encrypted_block))
+                if not encrypted_block:
+                    return
 
-                    final_block = decryptor.finalize()
-                    f.write(final_block)
-                    pbar.update(len(final_block))
-            else:
-                handle = winDiskHandler.DiskHandler(
-                    file_path, self.buffer_size)
-                current_offset = start_pos
-                remaining_size = total_size
+                decrypted_block = decryptor.update(encrypted_block)
 
-                def align_data(pbar, handle):
-                    nonlocal remaining_size, current_offset
+                handle.write_data(current_offset, decrypted_block)
 
-                    start_A_pos = sec_size * (start_pos // sec_size)
-                    end_A_pos = start_A_pos + sec_size
-                    align_read_size = end_A_pos - start_pos
+                current_offset += len(decrypted_block)
+                remaining_size -= len(decrypted_block)
+                pbar.update(len(encrypted_block))
 
-                    to_read = min(remaining_size, align_read_size)
-                    encrypted_block = handle.read_data(current_offset, to_read)
+            with tqdm(total=total_size, desc=Msg.PBar.decrypting_part, unit="B", unit_scale=True) as pbar:
+                sec_size = self.buffer_size
+                if start_pos % sec_size:
+                    align_data(pbar, handle)
+                while remaining_size > 0:
+                    to_read = min(self.buffer_size, remaining_size)
+                    encrypted_block = handle.read_data(
+                        current_offset, to_read)
 
                     if not encrypted_block:
-                        return
+                        break
 
                     decrypted_block = decryptor.update(encrypted_block)
 
-                    handle.write_data(current_offset, decrypted_block)
+                    if to_read % 512 == 0:
+                        handle.write_aligned_data(
+                            current_offset, decrypted_block)
+                    else:
+                        handle.write_data(current_offset, decrypted_block)
 
                     current_offset += len(decrypted_block)
                     remaining_size -= len(decrypted_block)
                     pbar.update(len(encrypted_block))
 
-                with tqdm(total=total_size, desc=Msg.PBar.decrypting_part, unit="B", unit_scale=True) as pbar:
-                    sec_size = self.buffer_size
-                    if start_pos % sec_size:
-                        align_data(pbar, handle)
-                    while remaining_size > 0:
-                        to_read = min(self.buffer_size, remaining_size)
-                        encrypted_block = handle.read_data(
-                            current_offset, to_read)
-
-                        if not encrypted_block:
-                            break
-
-                        decrypted_block = decryptor.update(encrypted_block)
-
-                        if to_read % 512 == 0:
-                            handle.write_aligned_data(
-                                current_offset, decrypted_block)
-                        else:
-                            handle.write_data(current_offset, decrypted_block)
-
-                        current_offset += len(decrypted_block)
-                        remaining_size -= len(decrypted_block)
-                        pbar.update(len(encrypted_block))
-
-                    final_block = decryptor.finalize()
-                    handle.write_data(current_offset, final_block)
-                    pbar.update(len(final_block))
-                handle.close_disk()
+                final_block = decryptor.finalize()
+                handle.write_data(current_offset, final_block)
+                pbar.update(len(final_block))
+            handle.close_disk()
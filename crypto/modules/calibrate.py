@@ -0,0 +1,79 @@
+import os
+import json
+import time
+from . import hashing
+from .wrapers.logging import logging
+from .constants import Msg, Def_val
+
+candidates = [64 * 1024, 128 * 1024, 256 * 1024, 512 * 1024,
+              1024**2, 2 * 1024**2, 4 * 1024**2, 8 * 1024**2, 16 * 1024**2]
+probe_size = 16 * 1024**2
+
+
+def device_identity(container_path: str, disk_mode: bool, container_size: int) -> str:
+    if disk_mode:
+        return f"disk:{container_path}:{container_size}"
+    # device numbers of removable media change between mounts, the folder
+    # of the container does not
+    return f"file:{os.path.dirname(os.path.abspath(container_path))}"
+
+
+def load_cache(cache_path: str = Def_val.calibration_cache) -> dict:
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache: dict, cache_path: str = Def_val.calibration_cache) -> None:
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+
+
+def probe(container_path: str, disk_mode: bool, container_size: int,
+          algorithm: str = Def_val.hash_algorithm) -> dict[int, float]:
+    # Read-only probe of the path the calibrated size is used for: every
+    # candidate hashes probe_size bytes from its own region of the target in
+    # one thread, so cached pages from one candidate do not flatter the next.
+    sizes = [size for size in candidates if size <= container_size]
+    region = max(probe_size, container_size // max(len(sizes), 1))
+
+    results = {}
+    for index, read_size in enumerate(sizes):
+        start = (index * region) % max(container_size - probe_size, 1)
+        start -= start % read_size
+        length = min(probe_size, container_size - start)
+        length -= length % read_size
+        if length <= 0:
+            continue
+
+        begin = time.perf_counter()
+        hashing.hash_range(container_path, disk_mode, read_size, start, start + length, algorithm, threads=1)
+        seconds = time.perf_counter() - begin
+        results[read_size] = length / seconds / 1024**2 if seconds else 0.0
+    return results
+
+
+def calibrate(container_path: str, disk_mode: bool, container_size: int, cache_path: str = Def_val.calibration_cache,
+              algorithm: str = Def_val.hash_algorithm) -> int | None:
+    identity = device_identity(container_path, disk_mode, container_size)
+    cache = load_cache(cache_path)
+    if identity in cache:
+        buffer_size = cache[identity]["buffer_size"]
+        logging.info(Msg.Info.buffer_size_from_cache(buffer_size, identity))
+        return buffer_size
+
+    results = probe(container_path, disk_mode, container_size, algorithm)
+    if not results:
+        return None
+    buffer_size = max(results, key=results.get)
+    cache[identity] = {
+        "buffer_size": buffer_size,
+        "throughput": {str(size): mb_s for size, mb_s in results.items()},
+    }
+    save_cache(cache, cache_path)
+    logging.info(Msg.Info.buffer_size_calibrated(buffer_size, identity))
+    return buffer_size
@@ -0,0 +1,298 @@
+import io
+import os
+import bisect
+import hmac
+import json
+import hashlib
+import secrets
+import zipfile
+import fnmatch
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives import hashes
+from cryptography.exceptions import InvalidTag
+from .constants import Msg, Def_val
+from .wrapers.logging import logging
+
+STORE_FILE = "store.json"
+CHUNKS_DIR = "chunks"
+GENERATIONS_DIR = "generations"
+NONCE_SIZE = 12
+
+
+def _derive_key(password: str, salt: bytes, iterations: int) -> bytes:
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32,
+                     salt=salt, iterations=iterations)
+    return kdf.derive(password.encode('utf-8'))
+
+
+class ChunkStore:
+    # Generations of one layer with content-defined deduplication. A layer
+    # (ZIP archive) is cut at its member boundaries and large members again
+    # every chunk_size bytes from their start, so an unchanged member gives
+    # the same chunks even when something was added before it. Every unique
+    # chunk is sealed with AES-GCM once and stored under the HMAC of its
+    # content, so the names do not reveal known data. Each generation keeps
+    # a sealed list of its chunks.
+    def __init__(self, store_path: str, password: str, chunk_size: int = Def_val.chunk_size,
+                 iterations: int = Def_val.chunk_store_iterations) -> None:
+        self.store_path = store_path
+        os.makedirs(os.path.join(store_path, CHUNKS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(store_path, GENERATIONS_DIR), exist_ok=True)
+
+        # chunk_size and iterations only apply to a new store
+        settings_path = os.path.join(store_path, STORE_FILE)
+        if os.path.exists(settings_path):
+            with open(settings_path, 'r') as f:
+                settings = json.load(f)
+        else:
+            settings = {
+                "version": 1,
+                "salt": secrets.token_hex(16),
+                "chunk_size": chunk_size,
+                "iterations": iterations,
+            }
+            with open(settings_path, 'w') as f:
+                json.dump(settings, f, indent=2)
+
+        self.chunk_size = settings["chunk_size"]
+        master_key = _derive_key(password, bytes.fromhex(settings["salt"]), settings["iterations"])
+        # separate keys for sealing chunks and for naming them
+        self._aead = AESGCM(hmac.new(master_key, b"chunk-encryption", hashlib.sha256).digest())
+        self._id_key = hmac.new(master_key, b"chunk-id", hashlib.sha256).digest()
+
+    def chunk_id(self, data) -> str:
+        return hmac.new(self._id_key, data, hashlib.sha256).hexdigest()
+
+    def chunk_path(self, chunk_id: str) -> str:
+        return os.path.join(self.store_path, CHUNKS_DIR, chunk_id[:2], chunk_id)
+
+    def has_chunk(self, chunk_id: str) -> bool:
+        return os.path.exists(self.chunk_path(chunk_id))
+
+    def write_chunk(self, data) -> tuple[str, bool]:
+        # (chunk id, True when the chunk was not stored yet)
+        chunk_id = self.chunk_id(data)
+        path = self.chunk_path(chunk_id)
+        if os.path.exists(path):
+            return chunk_id, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        sealed = self._aead.encrypt(nonce, bytes(data), chunk_id.encode())
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(nonce + sealed)
+        os.replace(temp_path, path)
+        return chunk_id, True
+
+    def read_chunk(self, chunk_id: str) -> bytes:
+        with open(self.chunk_path(chunk_id), 'rb') as f:
+            data = f.read()
+        plain = self._aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], chunk_id.encode())
+        if self.chunk_id(plain) != chunk_id:
+            raise InvalidTag(f"Chunk {chunk_id} does not match its name")
+        return plain
+
+    def boundaries(self, source, size: int) -> list[int]:
+        # chunk starts followed by size
+        cuts = {0, size}
+        try:
+            source.seek(0)
+            with zipfile.ZipFile(source) as zipf:
+                cuts.update(info.header_offset for info in zipf.infolist())
+                cuts.add(zipf.start_dir)
+        except zipfile.BadZipFile:
+            # not a ZIP archive: fixed-size chunks only
+            pass
+
+        points = sorted(cut for cut in cuts if 0 <= cut <= size)
+        result = []
+        for start, end in zip(points, points[1:]):
+            result.extend(range(start, end, self.chunk_size))
+        result.append(size)
+        return result
+
+    def put_generation(self, name: str, source, size: int | None = None) -> dict:
+        # source is a seekable layer, e.g. Core.open_layer() or a ZIP file
+        if size is None:
+            size = source.seek(0, io.SEEK_END)
+        cuts = self.boundaries(source, size)
+
+        chunks = []
+        new_chunks = []
+        new_bytes = 0
+        source.seek(0)
+        for start, end in zip(cuts, cuts[1:]):
+            data = read_exact(source, end - start)
+            chunk_id, is_new = self.write_chunk(data)
+            chunks.append([chunk_id, start, end - start])
+            if is_new:
+                new_chunks.append(self.chunk_path(chunk_id))
+                new_bytes += len(data)
+
+        self._save_generation(name, {"size": size, "chunks": chunks})
+        logging.info(Msg.Info.generation_stored(name, len(chunks), len(new_chunks), new_bytes))
+        return {
+            "size": size,
+            "chunks": len(chunks),
+            "new_chunks": new_chunks,
+            "new_bytes": new_bytes,
+        }
+
+    def _generation_path(self, name: str) -> str:
+        return os.path.join(self.store_path, GENERATIONS_DIR, f"{name}.gen")
+
+    def _save_generation(self, name: str, generation: dict) -> None:
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        sealed = self._aead.encrypt(nonce, json.dumps(generation).encode(), name.encode())
+        path = self._generation_path(name)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(nonce + sealed)
+        os.replace(path + ".tmp", path)
+
+    def load_generation(self, name: str) -> dict:
+        # {"size": layer size, "chunks": [[chunk id, offset, length], ...]}
+        with open(self._generation_path(name), 'rb') as f:
+            data = f.read()
+        return json.loads(self._aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], name.encode()))
+
+    def generations(self) -> list[str]:
+        directory = os.path.join(self.store_path, GENERATIONS_DIR)
+        return sorted(file[:-4] for file in os.listdir(directory) if file.endswith(".gen"))
+
+    def open_generation(self, name: str) -> "GenerationReader":
+        return GenerationReader(self, self.load_generation(name))
+
+    def restore(self, name: str, output_path: str) -> int:
+        # writes the whole layer of the generation to output_path
+        generation = self.load_generation(name)
+        with open(output_path, 'wb') as f:
+            for chunk_id, _, _ in generation["chunks"]:
+                f.write(self.read_chunk(chunk_id))
+        return generation["size"]
+
+    def extract(self, name: str, output_path: str, pattern: str | None = None) -> list[str]:
+        # only the chunks of the central directory and of the selected
+        # members are read
+        with self.open_generation(name) as reader, zipfile.ZipFile(reader) as zipf:
+            names = select_members(zipf, pattern)
+            for member in names:
+                zipf.extract(member, output_path)
+        return names
+
+    def required_chunks(self, name: str, pattern: str | None = None) -> list[str]:
+        # Chunks to fetch before a restore, in layer order. Without a pattern
+        # that is every chunk; with one, the central directory chunks (which
+        # must be at hand to read it) and those of the selected members.
+        generation = self.load_generation(name)
+        if pattern is None:
+            return list(dict.fromkeys(chunk_id for chunk_id, _, _ in generation["chunks"]))
+
+        reader = GenerationReader(self, generation)
+        with reader, zipfile.ZipFile(reader) as zipf:
+            ranges = [(zipf.start_dir, generation["size"])]
+            infos = sorted(zipf.infolist(), key=lambda info: info.header_offset)
+            ends = [info.header_offset for info in infos[1:]] + [zipf.start_dir]
+            selected = set(select_members(zipf, pattern))
+            ranges.extend((info.header_offset, end) for info, end in zip(infos, ends)
+                          if info.filename in selected)
+
+        needed = []
+        for chunk_id, start, length in generation["chunks"]:
+            if any(start < end and range_start < start + length for range_start, end in ranges):
+                needed.append(chunk_id)
+        return list(dict.fromkeys(needed))
+
+    def prune(self, keep: list[str]) -> int:
+        # drops the generations not in keep and the chunks nothing refers to
+        # any more; returns the number of removed chunks
+        for name in self.generations():
+            if name not in keep:
+                os.remove(self._generation_path(name))
+
+        referenced = set()
+        for name in self.generations():
+            referenced.update(chunk_id for chunk_id, _, _ in self.load_generation(name)["chunks"])
+
+        removed = 0
+        chunks_dir = os.path.join(self.store_path, CHUNKS_DIR)
+        for root, _, files in os.walk(chunks_dir):
+            for file in files:
+                if file not in referenced:
+                    os.remove(os.path.join(root, file))
+                    removed += 1
+        return removed
+
+
+class GenerationReader(io.RawIOBase):
+    # Seekable file object over a generation. Chunks are decrypted on first
+    # access and the last one read stays cached.
+    def __init__(self, store: ChunkStore, generation: dict) -> None:
+        super().__init__()
+        self.store = store
+        self.size = generation["size"]
+        self.chunks = generation["chunks"]
+        self.starts = [start for _, start, _ in self.chunks]
+        self.position = 0
+        self.fetched = set()
+        self._cached = (None, b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        return self.position
+
+    def _chunk(self, index: int) -> bytes:
+        if self._cached[0] != index:
+            chunk_id = self.chunks[index][0]
+            self._cached = (index, self.store.read_chunk(chunk_id))
+            self.fetched.add(chunk_id)
+        return self._cached[1]
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        to_read = min(len(view), max(self.size - self.position, 0))
+        done = 0
+        while done < to_read:
+            index = bisect.bisect_right(self.starts, self.position) - 1
+            _, start, length = self.chunks[index]
+            inner = self.position - start
+            size = min(to_read - done, length - inner)
+            view[done:done + size] = self._chunk(index)[inner:inner + size]
+            done += size
+            self.position += size
+        return done
+
+
+def read_exact(source, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        block = source.read(size - len(data))
+        if not block:
+            raise EOFError(f"Layer ended {size - len(data)} bytes early")
+        data.extend(block)
+    return bytes(data)
+
+
+def select_members(zipf: zipfile.ZipFile, pattern: str | None = None) -> list[str]:
+    names = [info.filename for info in zipf.infolist() if not info.is_dir()]
+    if pattern is None:
+        return names
+    return [name for name in names
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(os.path.basename(name), pattern)]
@@ -22,15 +22,41 @@ def parse_note(note_path: str):
         "приоритет": "cpu_priority",
         "буффер": "buffer_size",
         "шум": "noize",
+        "потоки": "workers",
+        "конвейер": "pipeline",
+        "слияние": "fused_write",
+        "генератор": "noise_engine",
+        "потокишума": "noise_threads",
+        "точкашума": "noise_checkpoint_interval",
+        "хешалг": "hash_algorithm",
+        "потокихеша": "hash_threads",
+        "манифест": "manifest",
+        "сверка": "manifest_verify",
+        "слои": "layer_workers",
+        "память": "layer_memory",
+        "потокиде": "decrypt_workers",
+        "слоивывод": "layer_output",
+        "замеры": "bench_report",
+        "потокисжатия": "zip_workers",
 
         # encrypt
         "ши": "encrypt",
         "файлы": "files",
         "папки": "directories",
+        "сжатие": "compression",
+        "уровень": "compression_level",
+        "хранилище": "chunk_store",
 
         # decrypt
         "де": "decrypt",
         "вывод": "output",
+        "чтение": "readonly",
+        "шаблон": "pattern",
+        "список": "list",
+        "приманка": "decoy",
+
+        # incremental update
+        "инкремент": "incremental",
 
         # rar
         "рар": "rar",
@@ -72,6 +98,7 @@ def parse_note(note_path: str):
         "реалтайм": "realtime",
         "-": False,
         "+": True,
+        "авто": "auto",
         "_": ""
     }
 
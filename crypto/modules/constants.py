@@ -3,6 +3,7 @@ class Msg:
         archiving_container = "Attempting to archive the container..."
         archive_validated = "Archive validated."
         deleting_old_par2 = "Deleting old PAR2 files..."
+        layer_up_to_date = "Layer is up to date, nothing rewritten"
 
         @staticmethod
         def gpt_save_file_not_exists(gpt_save_file: str) -> str:
@@ -56,11 +57,80 @@ class Msg:
         def removing_container(container_path: str) -> str:
             return f"Removing container {container_path}"
 
+        @staticmethod
+        def extracted_matching(count: int, pattern: str, decrypted: int) -> str:
+            return f"Extracted {count} file(s) matching {pattern}, decrypted {decrypted} bytes"
+
+        @staticmethod
+        def listed_archive(count: int, decrypted: int) -> str:
+            return f"Listed {count} entries, decrypted {decrypted} bytes"
+
+        @staticmethod
+        def resuming_noise(offset: int, size: int) -> str:
+            return f"Resuming noise fill from {offset} of {size} bytes"
+
+        @staticmethod
+        def manifest_verified(path: str) -> str:
+            return f"All blocks match the manifest {path}"
+
+        @staticmethod
+        def manifest_saved(path: str) -> str:
+            return f"Manifest saved to {path}"
+
+        @staticmethod
+        def manifest_not_created(path: str) -> str:
+            return f"No manifest at {path} yet, the next encryption creates it"
+
+        @staticmethod
+        def encrypting_layers_in_parallel(count: int, workers: int) -> str:
+            return f"Encrypting {count} layers in {workers} worker processes"
+
+        @staticmethod
+        def generation_stored(name: str, chunks: int, new_chunks: int, new_bytes: int) -> str:
+            return f"Generation {name}: {chunks} chunks, {new_chunks} new ({new_bytes} bytes)"
+
+        @staticmethod
+        def layer_updated(changed: int, removed: int) -> str:
+            return f"Layer updated in place: {changed} members written, {removed} removed"
+
+        @staticmethod
+        def decrypting_layers_in_parallel(count: int, workers: int) -> str:
+            return f"Decrypting {count} layers in {workers} worker processes"
+
+        @staticmethod
+        def buffer_size_calibrated(buffer_size: int, identity: str) -> str:
+            return f"Calibrated read chunk size {buffer_size} bytes for {identity}"
+
+        @staticmethod
+        def buffer_size_from_cache(buffer_size: int, identity: str) -> str:
+            return f"Using cached read chunk size {buffer_size} bytes for {identity}"
+
     class Warn:
         container_doesnt_exist = "Container file does not exist."
         wrong_params = "Incorrect parameters."
         critical_value_not_found = "Critical value for par2disk is not found in config, impossible to continue."
+        xxhash_not_installed = "xxhash is not installed, falling back to crc32"
+        layer_rebuilt = "Layer cannot be updated in place, rebuilding it"
+
+        @staticmethod
+        def unknown_compression(codec: str) -> str:
+            return f"Unknown compression {codec}, using deflate"
 
+        @staticmethod
+        def manifest_unavailable(path: str) -> str:
+            return f"Manifest {path} cannot be opened with the given passwords, skipping verification"
+
+        @staticmethod
+        def layers_overlap(pairs) -> str:
+            return f"Layer extents overlap or may not fit the container {pairs}, encrypting layers one by one"
+
+        @staticmethod
+        def merged_file_renamed(path: str) -> str:
+            return f"File already extracted by another layer, saved as {path}"
+
+        @staticmethod
+        def unknown_hash_algorithm(algorithm: str) -> str:
+            return f"Unknown hash algorithm {algorithm}, falling back to crc32"
 
         @staticmethod
         def archive_integrity_check_failed(offending_file: str) -> str:
@@ -106,6 +176,18 @@ class Msg:
         rarfile_wrongpas = "Error: Incorrect password."
         wrong_pass = "Incorrect password."
 
+        @staticmethod
+        def archive_does_not_fit_layer(limit: int) -> str:
+            return f"The archive does not fit the layer ({limit} bytes available)"
+
+        @staticmethod
+        def layer_not_written(offset: int) -> str:
+            return f"The layer at {offset} was not written, its header is left unchanged"
+
+        @staticmethod
+        def manifest_damaged_block(index: int, start_pos: int, end_pos: int) -> str:
+            return f"Block {index} [{start_pos}, {end_pos}) does not match the manifest"
+
         @staticmethod
         def adding_file_error(file_path: str, error: Exception) -> str:
             return f"Error adding file {file_path}: {error}"
@@ -169,6 +251,7 @@ class Msg:
 
     class PBar:
         adding_to_archive = "Adding to archive"
+        decrypting_layers = "Decrypting layers"
         decrypting_part = "Decrypting"
         encrypting_part = "Encrypting"
         extracting_file = "Extracting files"
@@ -184,6 +267,39 @@ class Def_val:
     new_container_size = "1G"
     block_size = "10M"
     buffer_size = "4M"
+    calibration_cache = "calibration.json"
+    bench_report = "bench.json"
+    workers = 1
+    pipeline = False
+    readonly = False
+    fused_write = False
+    noise_engine = "keystream"
+    noise_threads = 4
+    noise_checkpoint = "noise_checkpoint.json"
+    noise_checkpoint_interval = "256M"
+    hash_algorithm = "crc32"
+    hash_threads = 4
+    hash_leaf_size = 64 * 1024 * 1024
+    manifest = ""
+    manifest_verify = False
+    manifest_block_size = 1024 * 1024
+    layer_workers = 1
+    layer_memory = "2G"
+    decrypt_workers = 1
+    incremental = False
+    compression = "deflate"
+    compression_level = None
+    zip_workers = 1
+    # share of dead member bytes after which a layer is rebuilt in full
+    incremental_compact = 0.5
+    chunk_store = ""
+    chunk_size = 4 * 1024 * 1024
+    chunk_store_iterations = 200000
+    generation_name = "%Y-%m-%d_%H-%M-%S"
+    layer_output = "merge"
+    decoy = False
+    decoy_size = "1M"
+    decoy_name = "archive.bin"
     noize = True
     cpu_priority = "normal"
     split_mode = False
@@ -0,0 +1,213 @@
+import io
+import os
+from collections import OrderedDict
+from . import winDiskHandler
+
+
+class ContainerWriter(io.RawIOBase):
+    # Seekable file object over [offset, offset + limit) of a container file
+    # or disk. Writes are gathered into buffer_size units (the same units Aes
+    # uses) and only whole units reach the device; with aes_obj set every
+    # unit is encrypted on its way out, so the range ends up exactly as
+    # write_zip_to_cont followed by Aes._encrypt would leave it.
+    max_cached_units = 4
+
+    def __init__(self, container_path: str, offset: int, buffer_size: int, isDisk: bool, aes_obj=None,
+                 limit: int | None = None, size: int = 0) -> None:
+        super().__init__()
+        self.offset = offset
+        self.buffer_size = buffer_size
+        self.isDisk = isDisk
+        self.aes_obj = aes_obj
+        self.position = 0
+        # bytes already in the range, e.g. an existing archive being updated
+        self.size = size
+        self.units = OrderedDict()
+        self.dirty = set()
+        # set once a write ran into the end of the range
+        self.overflow = False
+
+        if isDisk:
+            self.handle = winDiskHandler.DiskHandler(
+                container_path, buffer_size)
+            self.file = None
+            container_size = self.handle.get_disk_size()
+        else:
+            self.handle = None
+            self.file = open(container_path, 'r+b', buffering=0)
+            container_size = os.fstat(self.file.fileno()).st_size
+
+        self.limit = container_size - offset
+        if limit is not None:
+            self.limit = min(self.limit, limit)
+
+        # in disk mode the first unit only reaches the next aligned offset
+        self.first_unit = buffer_size
+        if isDisk and offset % buffer_size:
+            self.first_unit = buffer_size - offset % buffer_size
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if self.position < 0:
+            raise ValueError(f"negative seek position {self.position}")
+        return self.position
+
+    def _unit_index(self, position: int) -> int:
+        if position < self.first_unit:
+            return 0
+        return 1 + (position - self.first_unit) // self.buffer_size
+
+    def _unit_start(self, index: int) -> int:
+        if index == 0:
+            return 0
+        return self.first_unit + (index - 1) * self.buffer_size
+
+    def _unit_length(self, index: int) -> int:
+        return self.first_unit if index == 0 else self.buffer_size
+
+    def _is_complete(self, index: int) -> bool:
+        return self._unit_start(index) + self._unit_length(index) <= self.size
+
+    def _load_unit(self, index: int) -> bytearray:
+        if index in self.units:
+            self.units.move_to_end(index)
+            return self.units[index]
+
+        start = self._unit_start(index)
+        length = min(self._unit_length(index), max(self.size - start, 0))
+        unit = bytearray()
+        if length:
+            # only complete units are ever evicted, so a stored unit always
+            # has its full length
+            absolute = self.offset + start
+            if self.file is not None:
+                self.file.seek(absolute)
+                block = self.file.read(length)
+            else:
+                block = self.handle.read_data(absolute, length)
+            if self.aes_obj is not None:
+                block = self.aes_obj.cipher.decryptor().update(block)
+            unit = bytearray(block)
+
+        self.units[index] = unit
+        self._evict()
+        return unit
+
+    def _flush_unit(self, index: int) -> None:
+        unit = self.units[index]
+        if index not in self.dirty or not unit:
+            return
+        block = bytes(unit)
+        if self.aes_obj is not None:
+            block = self.aes_obj.cipher.encryptor().update(block)
+
+        absolute = self.offset + self._unit_start(index)
+        if self.file is not None:
+            self.file.seek(absolute)
+            self.file.write(block)
+        elif absolute % self.buffer_size == 0 and len(block) % self.handle.SECTOR_SIZE == 0:
+            self.handle.write_aligned_data(absolute, block)
+        else:
+            self.handle.write_data(absolute, block)
+        self.dirty.discard(index)
+
+    def _evict(self) -> None:
+        for index in list(self.units):
+            if len(self.units) <= self.max_cached_units:
+                break
+            if self._is_complete(index):
+                self._flush_unit(index)
+                del self.units[index]
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        if self.position + len(view) > self.limit:
+            self.overflow = True
+            raise OSError(f"writing past the end of the container range ({self.limit} bytes)")
+        if self.position > self.size:
+            # zero-fill a gap left by seeking past the end
+            gap_start = self.size
+            self.seek(gap_start)
+            self.write(bytes(self.position - gap_start))
+
+        done = 0
+        while done < len(view):
+            index = self._unit_index(self.position)
+            unit = self._load_unit(index)
+            inner = self.position - self._unit_start(index)
+            chunk = min(len(view) - done, self._unit_length(index) - inner)
+            if inner > len(unit):
+                unit.extend(bytes(inner - len(unit)))
+            unit[inner:inner + chunk] = view[done:done + chunk]
+            self.dirty.add(index)
+            done += chunk
+            self.position += chunk
+            self.size = max(self.size, self.position)
+        return done
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        to_read = min(len(view), max(self.size - self.position, 0))
+        done = 0
+        while done < to_read:
+            index = self._unit_index(self.position)
+            unit = self._load_unit(index)
+            inner = self.position - self._unit_start(index)
+            chunk = min(to_read - done, len(unit) - inner)
+            if chunk <= 0:
+                break
+            view[done:done + chunk] = unit[inner:inner + chunk]
+            done += chunk
+            self.position += chunk
+        return done
+
+    def truncate(self, size: int | None = None) -> int:
+        # Only the logical size shrinks; bytes past it stay on the device as
+        # they are (ciphertext when aes_obj is set).
+        size = self.position if size is None else size
+        if size < self.size:
+            index = self._unit_index(size)
+            unit = self._load_unit(index)
+            del unit[size - self._unit_start(index):]
+            self.dirty.add(index)
+            for later in [later for later in self.units if later > index]:
+                del self.units[later]
+                self.dirty.discard(later)
+            self.size = size
+        return self.size
+
+    def flush(self) -> None:
+        if not self.closed:
+            for index in list(self.units):
+                self._flush_unit(index)
+        super().flush()
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self.flush()
+            finally:
+                if self.file is not None:
+                    self.file.close()
+                if self.handle is not None:
+                    self.handle.close_disk()
+        super().close()
@@ -0,0 +1,170 @@
+import zlib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from . import winDiskHandler
+from .wrapers.logging import logging
+from .constants import Def_val, Msg
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+algorithms = ("crc32", "blake2b", "xxh3")
+digest_size = 32
+
+
+def _gf2_matrix_times(matrix: list[int], vector: int) -> int:
+    result = 0
+    index = 0
+    while vector:
+        if vector & 1:
+            result ^= matrix[index]
+        vector >>= 1
+        index += 1
+    return result
+
+
+def _gf2_matrix_square(matrix: list[int]) -> list[int]:
+    return [_gf2_matrix_times(matrix, matrix[n]) for n in range(32)]
+
+
+def crc32_combine(crc1: int, crc2: int, length2: int) -> int:
+    # zlib's crc32_combine: CRC of A+B from crc(A), crc(B) and len(B)
+    if length2 <= 0:
+        return crc1
+    odd = [0xedb88320] + [1 << n for n in range(31)]
+    even = _gf2_matrix_square(odd)
+    odd = _gf2_matrix_square(even)
+    while True:
+        even = _gf2_matrix_square(odd)
+        if length2 & 1:
+            crc1 = _gf2_matrix_times(even, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+        odd = _gf2_matrix_square(even)
+        if length2 & 1:
+            crc1 = _gf2_matrix_times(odd, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+    return crc1 ^ crc2
+
+
+def leaf_ranges(start_pos: int, end_pos: int, leaf_size: int) -> list[tuple[int, int]]:
+    # Leaves sit on absolute multiples of leaf_size, so the result does not
+    # depend on the number of threads or the buffer size.
+    ranges = []
+    current = start_pos
+    while current < end_pos:
+        leaf_end = min((current // leaf_size + 1) * leaf_size, end_pos)
+        ranges.append((current, leaf_end))
+        current = leaf_end
+    return ranges
+
+
+def read_range(file_path: str, disk_mode: bool, buffer_size: int, start_pos: int, end_pos: int, update, progress) -> None:
+    if not disk_mode:
+        buffer = bytearray(buffer_size)
+        view = memoryview(buffer)
+        with open(file_path, 'rb', buffering=0) as f:
+            f.seek(start_pos)
+            remaining = end_pos - start_pos
+            while remaining > 0:
+                read = f.readinto(view[:min(buffer_size, remaining)])
+                if not read:
+                    break
+                update(view[:read])
+                remaining -= read
+                progress(read)
+    else:
+        handle = winDiskHandler.DiskHandler(file_path, buffer_size)
+        try:
+            current = start_pos
+            while current < end_pos:
+                # keep reads on buffer_size boundaries like the serial path
+                read_size = min(buffer_size - current % buffer_size, end_pos - current)
+                chunk = handle.read_data(current, read_size)
+                update(chunk)
+                current += read_size
+                progress(read_size)
+        finally:
+            handle.close_disk()
+
+
+def _blake2b_node(leaf_size: int, node_offset: int, node_depth: int, last_node: bool):
+    return hashlib.blake2b(digest_size=digest_size, fanout=0, depth=2, leaf_size=leaf_size,
+                           node_offset=node_offset, node_depth=node_depth,
+                           inner_size=digest_size, last_node=last_node)
+
+
+def hash_leaf(algorithm: str, file_path: str, disk_mode: bool, buffer_size: int, leaf_size: int,
+              index: int, last: bool, start_pos: int, end_pos: int, progress):
+    match algorithm:
+        case "crc32":
+            state = [0]
+
+            def update(data):
+                state[0] = zlib.crc32(data, state[0])
+
+            read_range(file_path, disk_mode, buffer_size, start_pos, end_pos, update, progress)
+            return state[0]
+        case "blake2b":
+            node = _blake2b_node(leaf_size, index, 0, last)
+        case "xxh3":
+            node = xxhash.xxh3_128()
+    read_range(file_path, disk_mode, buffer_size, start_pos, end_pos, node.update, progress)
+    return node.digest()
+
+
+def merge(algorithm: str, leaves: list, ranges: list[tuple[int, int]], leaf_size: int) -> str:
+    match algorithm:
+        case "crc32":
+            crc = 0
+            for leaf_crc, (start_pos, end_pos) in zip(leaves, ranges):
+                crc = crc32_combine(crc, leaf_crc, end_pos - start_pos)
+            return hex(crc & 0xffffffff)[2:]
+        case "blake2b":
+            root = _blake2b_node(leaf_size, 0, 1, True)
+        case "xxh3":
+            root = xxhash.xxh3_128()
+    for leaf in leaves:
+        root.update(leaf)
+    return root.hexdigest()
+
+
+def resolve_algorithm(algorithm: str) -> str:
+    if algorithm not in algorithms:
+        logging.warning(Msg.Warn.unknown_hash_algorithm(algorithm))
+        return "crc32"
+    if algorithm == "xxh3" and xxhash is None:
+        logging.warning(Msg.Warn.xxhash_not_installed)
+        return "crc32"
+    return algorithm
+
+
+def hash_range(file_path: str, disk_mode: bool, buffer_size: int, start_pos: int, end_pos: int,
+               algorithm: str = Def_val.hash_algorithm, threads: int = Def_val.hash_threads,
+               leaf_size: int = Def_val.hash_leaf_size, pbar=None) -> str:
+    algorithm = resolve_algorithm(algorithm)
+    ranges = leaf_ranges(start_pos, end_pos, leaf_size)
+    lock = threading.Lock()
+
+    def progress(size):
+        if pbar is not None:
+            with lock:
+                pbar.update(size)
+
+    def work(index):
+        leaf_start, leaf_end = ranges[index]
+        return hash_leaf(algorithm, file_path, disk_mode, buffer_size, leaf_size,
+                         index, index == len(ranges) - 1, leaf_start, leaf_end, progress)
+
+    if threads > 1 and len(ranges) > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            leaves = list(pool.map(work, range(len(ranges))))
+    else:
+        leaves = [work(index) for index in range(len(ranges))]
+    return merge(algorithm, leaves, ranges, leaf_size)
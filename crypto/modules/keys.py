@@ -0,0 +1,48 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.backends import default_backend
+from .aes import Aes
+
+header_iv_iterations = 12332
+header_iv_size = 16
+
+
+class KeySchedule:
+    # All key material one password needs for a run: the XTS key and tweak
+    # used by Aes and the IV stored in the layer header.
+    def __init__(self, password: str, xts_key: bytes, iv: bytes, header_iv: bytes) -> None:
+        self.password = password
+        self.xts_key = xts_key
+        self.iv = iv
+        self.header_iv = header_iv
+
+
+def derive_header_iv(password: str) -> bytes:
+    backend = default_backend()
+    salt = password.encode()
+    kdf_iv = PBKDF2HMAC(
+        algorithm=hashes.SHA1(),
+        length=header_iv_size,
+        salt=salt,
+        iterations=header_iv_iterations,
+        backend=backend
+    )
+    return kdf_iv.derive(password.encode())
+
+
+def derive(password: str) -> KeySchedule:
+    key, iv = Aes()._derive_key_and_iv(
+        password, Aes.key_iterations, Aes.iv_iterations, Aes.key_size, Aes.iv_size)
+    return KeySchedule(password, key[:32] + key[32:], iv, derive_header_iv(password))
+
+
+def derive_schedules(passwords, workers: int | None = None) -> dict[str, KeySchedule]:
+    unique = list(dict.fromkeys(passwords))
+    if len(unique) < 2:
+        return {password: derive(password) for password in unique}
+
+    workers = min(len(unique), workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(unique, executor.map(derive, unique)))
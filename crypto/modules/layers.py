@@ -0,0 +1,155 @@
+import os
+import shutil
+import importlib.util
+from . import header
+from .config import get_extradir
+from .constants import Def_val
+
+# local file header + central directory entry + ZIP64 extras + descriptor
+entry_overhead = 256
+end_records = 22 + 56 + 20
+# worst-case expansion of incompressible input, as a divisor of its size:
+# deflate adds a few bytes per 16K stored block, bzip2 and lzma more
+codec_slack = {"stored": 0, "deflate": 1000, "bzip2": 50, "lzma": 100}
+# per-process memory estimate for one layer: container writer cache and
+# cipher buffers on top of the interpreter itself
+base_process_memory = 64 * 1024 * 1024
+buffers_per_layer = 8
+
+
+class LayerExtent:
+    # Planned byte range of one layer. guard_start/guard_end widen it by the
+    # hashsum_limit regions encrypt_archive hashes around the layer.
+    def __init__(self, index: int, password: str, start: int, end: int, hashsum_limit: int, extra_name: str) -> None:
+        self.index = index
+        self.password = password
+        self.start = start
+        self.end = end
+        self.guard_start = max(start - 1 - hashsum_limit, 0)
+        self.guard_end = end + 1 + hashsum_limit
+        self.extra_name = extra_name
+
+    def overlaps(self, other: "LayerExtent") -> bool:
+        # each layer's guarded range must stay clear of the other layer
+        return self.guard_start < other.end and other.start < self.guard_end
+
+
+def input_entries(encrypt_config) -> tuple[int, int, int]:
+    # (bytes, entries, name bytes) that zip_archive will store for a layer
+    total = entries = names = 0
+    paths = [file for file in encrypt_config.get('files', []) if file]
+    for directory in encrypt_config.get('directories', []):
+        if os.path.isdir(directory):
+            for root, sub_dirs, files in os.walk(directory):
+                entries += len(sub_dirs) + 1
+                names += sum(len(os.path.join(root, sub_dir)) for sub_dir in sub_dirs)
+                paths.extend(os.path.join(root, file) for file in files)
+    extra_dir = get_extradir(encrypt_config)
+    if extra_dir and os.path.isdir(extra_dir):
+        for root, _, files in os.walk(extra_dir):
+            paths.extend(os.path.join(root, file) for file in files)
+    for path in paths:
+        if os.path.isfile(path):
+            total += os.path.getsize(path)
+            entries += 1
+            names += len(path)
+    return total, entries, names
+
+
+def archive_size_bound(encrypt_config) -> int:
+    total, entries, names = input_entries(encrypt_config)
+    slack = codec_slack.get(encrypt_config.get("compression", Def_val.compression), 50)
+    expansion = total // slack if slack else 0
+    return total + expansion + entries * entry_overhead + 2 * names + end_records
+
+
+def plan(encrypt_configs, block_size: int, parse_size) -> list[LayerExtent]:
+    extents = []
+    for index, encrypt_config in enumerate(encrypt_configs):
+        password = encrypt_config['password']
+        offset = len(password) * block_size
+        header_size = header.calculate_offset(password, 1024) + header.data_size
+        hashsum_limit = parse_size(encrypt_config["hashsum_limit"]) if "hashsum_limit" in encrypt_config else 0
+        extra_dir = get_extradir(encrypt_config)
+        extents.append(LayerExtent(index, password, offset,
+                                   offset + header_size + archive_size_bound(encrypt_config),
+                                   hashsum_limit, os.path.basename(extra_dir) if extra_dir else ""))
+    return extents
+
+
+def conflicts(extents: list[LayerExtent], container_size: int | None) -> list[tuple[int, int]]:
+    # Pairs of layer indexes that cannot run at the same time; a layer that
+    # may run past the container end conflicts with itself.
+    found = []
+    for position, extent in enumerate(extents):
+        if container_size is not None and extent.end > container_size:
+            found.append((extent.index, extent.index))
+        for other in extents[position + 1:]:
+            # the extra directory is packed into a same-named file in the cwd
+            if extent.overlaps(other) or other.overlaps(extent) \
+                    or (extent.extra_name and extent.extra_name == other.extra_name):
+                found.append((extent.index, other.index))
+    return found
+
+
+def worker_count(requested: int, layers: int, buffer_size: int, memory_limit: int) -> int:
+    per_layer = base_process_memory + buffers_per_layer * buffer_size
+    return max(1, min(requested, layers, memory_limit // per_layer))
+
+
+_core_class = None
+
+
+def _load_core(core_path: str):
+    # The crypto/core/ package shadows core.py on sys.path, so worker
+    # processes load the Core class from its file.
+    global _core_class
+    if _core_class is None:
+        spec = importlib.util.spec_from_file_location("core_layer_worker", core_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _core_class = module.Core
+    return _core_class
+
+
+def encrypt_layer(core_path: str, core_conf: dict, disk_mode: bool, encrypt_config) -> tuple[int, int] | None:
+    core = _load_core(core_path)(core_conf, disk_mode)
+    return core.encrypt_archive(encrypt_config)
+
+
+def group_by_offset(jobs: list, workers: int) -> list[list]:
+    # jobs are sorted by layer offset; every worker gets a contiguous run
+    # of them so its reads move forward through the container
+    groups = []
+    start = 0
+    for index in range(workers):
+        end = start + (len(jobs) - start) // (workers - index)
+        groups.append(jobs[start:end])
+        start = end
+    return [group for group in groups if group]
+
+
+def decrypt_layers(core_path: str, core_conf: dict, disk_mode: bool, jobs, decoy: bool, progress_queue) -> None:
+    core = _load_core(core_path)(core_conf, disk_mode)
+    core.progress = progress_queue.put
+    for layer_output, password in jobs:
+        os.makedirs(layer_output, exist_ok=True)
+        core.decrypt_archive(layer_output, password, True, decoy)
+
+
+def merge_output(layer_output: str, output_path: str, suffix: str) -> list[str]:
+    # Moves one layer's files into output_path. A name that already exists
+    # there is kept and the incoming file gets the layer suffix instead.
+    renamed = []
+    for root, _, files in os.walk(layer_output):
+        target_root = os.path.join(output_path, os.path.relpath(root, layer_output))
+        os.makedirs(target_root, exist_ok=True)
+        for file in files:
+            target = os.path.join(target_root, file)
+            if os.path.exists(target):
+                stem, extension = os.path.splitext(file)
+                target = os.path.join(target_root, f"{stem}.{suffix}{extension}")
+                renamed.append(target)
+            os.replace(os.path.join(root, file), target)
+    shutil.rmtree(layer_output, ignore_errors=True)
+    return renamed
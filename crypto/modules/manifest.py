@@ -0,0 +1,185 @@
+import os
+import struct
+import hashlib
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives import hashes
+from cryptography.exceptions import InvalidTag
+from . import winDiskHandler
+from .constants import Def_val
+
+MAGIC = b"MNF1"
+digest_size = 16
+kdf_iterations = 200000
+blocks_per_task = 64
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.blake2b(left + right, digest_size=digest_size, person=b"node").digest()
+
+
+class Manifest:
+    # Per-block BLAKE2b hashes of the container and the hash tree over them.
+    # levels[0] are the leaves, levels[-1] holds the root; an odd node is
+    # carried up unchanged.
+    def __init__(self, size: int, block_size: int, leaves: list[bytes]) -> None:
+        self.size = size
+        self.block_size = block_size
+        self.leaves = leaves
+        self.levels = self._build_levels()
+
+    def _build_levels(self) -> list[list[bytes]]:
+        levels = [list(self.leaves)]
+        while len(levels[-1]) > 1:
+            level = levels[-1]
+            levels.append([_node(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                           for i in range(0, len(level), 2)])
+        return levels
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0] if self.leaves else b""
+
+    def block_count(self) -> int:
+        return -(-self.size // self.block_size)
+
+    def blocks_in(self, start_pos: int, end_pos: int) -> range:
+        start_pos = max(start_pos, 0)
+        end_pos = min(end_pos, self.size)
+        if end_pos <= start_pos:
+            return range(0)
+        return range(start_pos // self.block_size, (end_pos - 1) // self.block_size + 1)
+
+    def diff(self, other: "Manifest") -> list[int]:
+        # Walk both trees from the root and only descend into subtrees whose
+        # hashes differ, so matching regions cost nothing.
+        if (self.size, self.block_size) != (other.size, other.block_size):
+            return list(range(max(self.block_count(), other.block_count())))
+        if not self.leaves:
+            return []
+        damaged = []
+        stack = [(len(self.levels) - 1, 0)]
+        while stack:
+            depth, index = stack.pop()
+            if self.levels[depth][index] == other.levels[depth][index]:
+                continue
+            if depth == 0:
+                damaged.append(index)
+                continue
+            children = len(self.levels[depth - 1])
+            for child in (2 * index + 1, 2 * index):
+                if child < children:
+                    stack.append((depth - 1, child))
+        return sorted(damaged)
+
+    def to_bytes(self) -> bytes:
+        return struct.pack(">QQ", self.size, self.block_size) + b"".join(self.leaves)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Manifest":
+        size, block_size = struct.unpack(">QQ", data[:16])
+        body = data[16:]
+        leaves = [body[i:i + digest_size] for i in range(0, len(body), digest_size)]
+        return cls(size, block_size, leaves)
+
+
+def _hash_group(file_path: str, disk_mode: bool, buffer_size: int, block_size: int, size: int, indices) -> dict[int, bytes]:
+    leaves = {}
+    if not disk_mode:
+        buffer = bytearray(buffer_size)
+        view = memoryview(buffer)
+        with open(file_path, 'rb', buffering=0) as f:
+            for index in indices:
+                node = hashlib.blake2b(digest_size=digest_size, person=b"leaf")
+                start_pos = index * block_size
+                remaining = min(block_size, size - start_pos)
+                f.seek(start_pos)
+                while remaining > 0:
+                    read = f.readinto(view[:min(buffer_size, remaining)])
+                    if not read:
+                        break
+                    node.update(view[:read])
+                    remaining -= read
+                leaves[index] = node.digest()
+    else:
+        handle = winDiskHandler.DiskHandler(file_path, buffer_size)
+        try:
+            for index in indices:
+                node = hashlib.blake2b(digest_size=digest_size, person=b"leaf")
+                current = index * block_size
+                end_pos = min(current + block_size, size)
+                while current < end_pos:
+                    read_size = min(buffer_size - current % buffer_size, end_pos - current)
+                    node.update(handle.read_data(current, read_size))
+                    current += read_size
+                leaves[index] = node.digest()
+        finally:
+            handle.close_disk()
+    return leaves
+
+
+def hash_blocks(file_path: str, disk_mode: bool, buffer_size: int, block_size: int, size: int,
+                indices, threads: int = Def_val.hash_threads) -> dict[int, bytes]:
+    indices = list(indices)
+    groups = [indices[i:i + blocks_per_task] for i in range(0, len(indices), blocks_per_task)]
+    leaves = {}
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        for result in pool.map(lambda group: _hash_group(
+                file_path, disk_mode, buffer_size, block_size, size, group), groups):
+            leaves.update(result)
+    return leaves
+
+
+def build(file_path: str, disk_mode: bool, buffer_size: int, size: int,
+          block_size: int = Def_val.manifest_block_size, threads: int = Def_val.hash_threads) -> Manifest:
+    count = -(-size // block_size)
+    leaves = hash_blocks(file_path, disk_mode, buffer_size, block_size, size, range(count), threads)
+    return Manifest(size, block_size, [leaves[index] for index in range(count)])
+
+
+def refresh(stored: Manifest, file_path: str, disk_mode: bool, buffer_size: int, ranges,
+            threads: int = Def_val.hash_threads) -> Manifest:
+    # the stored manifest with the blocks of ranges hashed again; the tree
+    # over the leaves is rebuilt in memory without reading anything else
+    indices = sorted({index for start_pos, end_pos in ranges
+                      for index in stored.blocks_in(start_pos, end_pos)})
+    leaves = list(stored.leaves)
+    for index, leaf in hash_blocks(file_path, disk_mode, buffer_size, stored.block_size,
+                                   stored.size, indices, threads).items():
+        leaves[index] = leaf
+    return Manifest(stored.size, stored.block_size, leaves)
+
+
+def _derive_key(password: str, salt: bytes) -> bytes:
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32,
+                     salt=salt, iterations=kdf_iterations)
+    return kdf.derive(password.encode('utf-8'))
+
+
+def save(manifest: Manifest, manifest_path: str, password: str) -> None:
+    salt = secrets.token_bytes(16)
+    nonce = secrets.token_bytes(12)
+    data = AESGCM(_derive_key(password, salt)).encrypt(nonce, manifest.to_bytes(), MAGIC)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC + salt + nonce + data)
+    os.replace(temp_path, manifest_path)
+
+
+def load(manifest_path: str, passwords) -> Manifest | None:
+    # The sidecar is sealed with one of the layer passwords, try each.
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        return None
+    salt, nonce, sealed = data[4:20], data[20:32], data[32:]
+    for password in passwords:
+        try:
+            return Manifest.from_bytes(AESGCM(_derive_key(password, salt)).decrypt(nonce, sealed, MAGIC))
+        except InvalidTag:
+            continue
+    return None
@@ -0,0 +1,117 @@
+import os
+import json
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+from .constants import Def_val
+
+
+class SecretsNoise:
+    # Original generator: every chunk comes straight from the OS CSPRNG.
+    def chunks(self, total: int, buffer_size: int, start: int = 0):
+        position = start
+        while position < total:
+            size = min(buffer_size, total - position)
+            yield position, secrets.token_bytes(size)
+            position += size
+
+
+class KeystreamNoise:
+    # AES-256-CTR keystream under a random key from secrets. Every chunk
+    # starts at its own counter, so chunks are generated independently on a
+    # thread pool into reused buffers while the caller writes earlier ones.
+    def __init__(self, threads: int = Def_val.noise_threads) -> None:
+        self.threads = max(1, threads)
+        self.key = secrets.token_bytes(32)
+        self.nonce = int.from_bytes(secrets.token_bytes(16), 'big')
+
+    def fill(self, index: int, blocks_per_chunk: int, source, out: bytearray) -> int:
+        counter = (self.nonce + index * blocks_per_chunk) % (1 << 128)
+        cipher = Cipher(algorithms.AES(self.key), modes.CTR(counter.to_bytes(16, 'big')),
+                        backend=default_backend())
+        return cipher.encryptor().update_into(source, out)
+
+    def chunks(self, total: int, buffer_size: int, start: int = 0):
+        # start is a multiple of buffer_size when resuming an interrupted fill
+        count = -(-(total - start) // buffer_size)
+        blocks_per_chunk = -(-buffer_size // 16)
+        zeros = memoryview(bytes(buffer_size))
+        depth = self.threads * 2
+        buffers = [bytearray(buffer_size + 15) for _ in range(min(depth, count))]
+
+        def submit(pool, index):
+            position = start + index * buffer_size
+            size = min(buffer_size, total - position)
+            out = buffers[index % len(buffers)]
+            return pool.submit(self.fill, position // buffer_size, blocks_per_chunk, zeros[:size], out)
+
+        pool = ThreadPoolExecutor(max_workers=self.threads)
+        try:
+            pending = [submit(pool, index) for index in range(len(buffers))]
+            for index in range(count):
+                size = pending[index % len(buffers)].result()
+                yield start + index * buffer_size, memoryview(buffers[index % len(buffers)])[:size]
+                # the consumer is done with this buffer, reuse it
+                if index + len(buffers) < count:
+                    pending[index % len(buffers)] = submit(pool, index + len(buffers))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def checkpoint_identity(container_path: str, disk_mode: bool) -> str:
+    if disk_mode:
+        return f"disk:{container_path}"
+    return f"file:{os.path.abspath(container_path)}"
+
+
+def read_checkpoint(checkpoint_path: str) -> dict:
+    if not os.path.exists(checkpoint_path):
+        return {}
+    try:
+        with open(checkpoint_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def fill_pending(checkpoint_path: str, identity: str) -> bool:
+    # A fill of this target was started and never finished, even if it
+    # stopped before the first confirmed chunk.
+    return read_checkpoint(checkpoint_path).get("identity") == identity
+
+
+def load_checkpoint(checkpoint_path: str, identity: str, size: int, buffer_size: int) -> int:
+    # Offset of the last confirmed chunk for this target, 0 if there is
+    # nothing to resume.
+    checkpoint = read_checkpoint(checkpoint_path)
+    if checkpoint.get("identity") != identity or checkpoint.get("size") != size:
+        return 0
+    offset = checkpoint.get("offset", 0)
+    if not 0 < offset < size or offset % buffer_size:
+        return 0
+    return offset
+
+
+def save_checkpoint(checkpoint_path: str, identity: str, size: int, offset: int) -> None:
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({"identity": identity, "size": size, "offset": offset}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, checkpoint_path)
+
+
+def clear_checkpoint(checkpoint_path: str) -> None:
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+def make_source(engine: str = Def_val.noise_engine, threads: int = Def_val.noise_threads):
+    match engine:
+        case "secrets":
+            return SecretsNoise()
+        case "keystream":
+            return KeystreamNoise(threads)
+        case _:
+            raise ValueError(f"Unknown noise engine: {engine}")
@@ -0,0 +1,329 @@
+import os
+import re
+import json
+from . import header, keys, layers, calibrate, winDiskHandler
+from .config import get_extradir
+from .constants import Def_val
+
+# benchmark operations whose throughput stands in for each stage
+stage_ops = {
+    "noise": ("create_noise", "noise_generate"),
+    "zip": ("write_zip_to_cont",),
+    "copy": ("read_archive",),
+    "split": ("read_archive",),
+    "encrypt": ("aes_encrypt",),
+    "decrypt": ("aes_decrypt",),
+    "hashsum": ("get_hashsum",),
+    "manifest": ("get_hashsum",),
+}
+# calibration.json measures read + hash on the target per read chunk size
+calibrated_stages = ("hashsum", "manifest")
+
+
+class Stage:
+    # Bytes one step of the protocol reads and writes. processed is the
+    # volume its throughput applies to, scratch the temporary space it needs.
+    def __init__(self, name: str, read: int = 0, written: int = 0, scratch: int = 0,
+                 processed: int | None = None, layer: str = "") -> None:
+        self.name = name
+        self.read = read
+        self.written = written
+        self.scratch = scratch
+        self.processed = max(read, written) if processed is None else processed
+        self.layer = layer
+        self.seconds = None
+
+
+class Plan:
+    def __init__(self, protocol: str, container_path: str, container_size: int, disk_mode: bool) -> None:
+        self.protocol = protocol
+        self.container_path = container_path
+        self.container_size = container_size
+        self.disk_mode = disk_mode
+        self.stages: list[Stage] = []
+        # (layer name, start, end); end is None when the header can't be read
+        self.extents: list[tuple[str, int, int | None]] = []
+        self.notes: list[str] = []
+
+    def add(self, *args, **kwargs) -> Stage:
+        stage = Stage(*args, **kwargs)
+        self.stages.append(stage)
+        return stage
+
+    @property
+    def read(self) -> int:
+        return sum(stage.read for stage in self.stages)
+
+    @property
+    def written(self) -> int:
+        return sum(stage.written for stage in self.stages)
+
+    @property
+    def scratch(self) -> int:
+        # temporary files are removed at the end of each stage
+        return max((stage.scratch for stage in self.stages), default=0)
+
+    @property
+    def seconds(self) -> float | None:
+        known = [stage.seconds for stage in self.stages if stage.seconds is not None]
+        return sum(known) if known else None
+
+
+def protocol(data: dict, disk_mode: bool) -> str:
+    # Same choice as orchestrate.pipeline: a drive letter selects the drive
+    # protocols, otherwise the sections present in the config decide.
+    encrypting = bool(data.get("encrypt"))
+    decrypting = bool(data.get("decrypt"))
+    if disk_mode:
+        if encrypting:
+            return "drive_encrypt"
+        return "drive_decrypt" if decrypting else ""
+    if encrypting:
+        if data.get("rar"):
+            return "encryptrar"
+        return "encrypt_split" if data.get("split_mode", Def_val.split_mode) else "encrypt"
+    if decrypting:
+        return "decryptrar" if data.get("unrar") else "decrypt"
+    return ""
+
+
+def recovery(section: dict, default) -> float:
+    value = section.get("recovery_percent", section.get("recovery_procent", default))
+    return float(value) / 100
+
+
+def load_bench(bench_path: str, target: str) -> list[dict]:
+    if not bench_path or not os.path.exists(bench_path):
+        return []
+    try:
+        with open(bench_path, 'r') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return []
+    for entry in report.get("targets", []):
+        if entry.get("target") == target:
+            return entry.get("results", [])
+    return []
+
+
+def pick_rate(results: list[dict], ops, buffer_size: int, workers: int) -> float | None:
+    # the run with the same buffer size and workers, or the closest match
+    for op in ops:
+        matches = [result for result in results if result.get("op") == op and result.get("mb_s")]
+        for key, value in (("buffer_size", buffer_size), ("workers", workers)):
+            narrowed = [result for result in matches if result.get(key) == value]
+            matches = narrowed or matches
+        if matches:
+            return matches[0]["mb_s"]
+    return None
+
+
+def throughputs(plan: Plan, buffer_size: int, io_size: int, workers: int, cache_path: str, bench_path: str) -> dict[str, float]:
+    rates = {}
+    identity = calibrate.device_identity(plan.container_path, plan.disk_mode, plan.container_size) \
+        if plan.disk_mode or os.path.exists(plan.container_path) else None
+    cached = calibrate.load_cache(cache_path).get(identity, {}) if identity else {}
+    measured = cached.get("throughput", {})
+    if measured:
+        rate = measured.get(str(io_size), max(measured.values()))
+        for name in calibrated_stages:
+            rates[name] = rate
+    results = load_bench(bench_path, plan.container_path if plan.disk_mode else "tempfile")
+    for name, ops in stage_ops.items():
+        # hash passes read in io_size chunks, the bench rows record it as buffer_size
+        rate = pick_rate(results, ops, io_size if name in calibrated_stages else buffer_size, workers)
+        if rate is not None:
+            rates[name] = rate
+    return rates
+
+
+def container_size(container_path: str, disk_mode: bool, buffer_size: int, new_size: int) -> int:
+    if disk_mode:
+        handle = winDiskHandler.DiskHandler(container_path, buffer_size)
+        try:
+            return handle.get_disk_size() or new_size
+        finally:
+            handle.close_disk()
+    if os.path.exists(container_path):
+        return os.path.getsize(container_path)
+    return new_size
+
+
+def hashed_around(start: int, end: int, limit: int, size: int) -> int:
+    # bytes get_first_part and get_second_part read around a layer
+    if not limit:
+        return 0
+    return min(limit, max(start - 1, 0)) + min(limit, max(size - end - 1, 0))
+
+
+def plan_encrypt(plan: Plan, data: dict, block_size: int, buffer_size: int, parse_size) -> None:
+    size = plan.container_size
+    fused = data.get("fused_write", Def_val.fused_write)
+    encrypt_configs = data["encrypt"] if isinstance(data["encrypt"], list) else [data["encrypt"]]
+    for extent, encrypt_config in zip(layers.plan(encrypt_configs, block_size, parse_size), encrypt_configs):
+        name = f"layer{extent.index + 1}"
+        plan.extents.append((name, extent.start, extent.end))
+        archive_size = extent.end - extent.start
+        input_size = layers.input_entries(encrypt_config)[0]
+        extra_dir = get_extradir(encrypt_config)
+        extra_size = layers.input_entries({"extra": extra_dir})[0] if extra_dir else 0
+        hashed = hashed_around(extent.start, extent.end, extent.guard_end - extent.end - 1, size)
+        if hashed:
+            plan.add("hashsum", read=hashed, layer=name)
+        # the extra directory is packed into a temporary archive first
+        if extra_size:
+            plan.add("copy", read=extra_size, written=extra_size, scratch=extra_size, layer=name)
+        plan.add("zip", read=input_size + extra_size, written=archive_size, layer=name)
+        if fused:
+            plan.add("encrypt", processed=archive_size, layer=name)
+        else:
+            plan.add("encrypt", read=archive_size, written=archive_size, layer=name)
+        if hashed:
+            plan.add("hashsum", read=hashed, layer=name)
+        if extent.end > size:
+            plan.notes.append(f"{name} may run past the container end ({extent.end} > {size})")
+
+
+def plan_decrypt(plan: Plan, data: dict, block_size: int, buffer_size: int, parse_size) -> None:
+    size = plan.container_size
+    decrypt_config = data["decrypt"]
+    passwords = decrypt_config["password"]
+    if isinstance(passwords, str):
+        passwords = [passwords]
+    readonly = decrypt_config.get("readonly", Def_val.readonly)
+    limit = min(parse_size(decrypt_config["hashsum_limit"]), size) if "hashsum_limit" in decrypt_config else 0
+    if limit:
+        plan.add("hashsum", read=limit)
+    exists = plan.disk_mode or os.path.exists(plan.container_path)
+    for index, password in enumerate(passwords):
+        name = f"layer{index + 1}"
+        offset = len(password) * block_size
+        passwd_offset = header.calculate_offset(password, 1024)
+        archive_size = None
+        if exists:
+            # reads only the layer header; a wrong password leaves the size unknown
+            ok, stored = header.read(plan.container_path, offset, passwd_offset,
+                                     keys.derive_header_iv(password), buffer_size, plan.disk_mode)
+            if ok:
+                archive_size = stored
+        if archive_size is None:
+            plan.extents.append((name, offset, None))
+            plan.notes.append(f"{name}: header not readable, size unknown")
+            continue
+        plan.extents.append((name, offset, offset + passwd_offset + header.data_size + archive_size))
+        if readonly:
+            plan.add("decrypt", read=archive_size, written=archive_size, layer=name)
+            continue
+        plan.add("decrypt", read=archive_size, written=archive_size, layer=name)
+        plan.add("copy", read=archive_size, written=archive_size, scratch=archive_size, layer=name)
+        plan.add("unzip", read=archive_size, written=archive_size, layer=name)
+        plan.add("encrypt", read=archive_size, written=archive_size, layer=name)
+    if limit:
+        plan.add("hashsum", read=limit)
+
+
+def build(data: dict, cache_path: str = Def_val.calibration_cache, bench_path: str = Def_val.bench_report) -> Plan:
+    from utils.data_utils import parse_size
+
+    container_path = data.get("container_path", Def_val.container_path)
+    disk_mode = re.fullmatch(r"[A-Za-z]:", container_path) is not None
+    if disk_mode:
+        container_path = rf"\\.\{container_path}"
+    block_size = parse_size(data.get("block_size", Def_val.block_size))
+    new_size = parse_size(data.get("new_container_size", Def_val.new_container_size))
+    buffer_value = data.get("buffer_size", Def_val.buffer_size)
+    buffer_size = parse_size(Def_val.buffer_size if buffer_value == "auto" else buffer_value)
+    size = container_size(container_path, disk_mode, buffer_size, new_size)
+    # "auto" only calibrates the read chunk; the XTS unit stays buffer_size
+    io_size = buffer_size
+    if buffer_value == "auto":
+        identity = calibrate.device_identity(container_path, disk_mode, size) \
+            if disk_mode or os.path.exists(container_path) else None
+        io_size = calibrate.load_cache(cache_path).get(identity, {}).get("buffer_size", buffer_size)
+
+    plan = Plan(protocol(data, disk_mode), container_path, size, disk_mode)
+    noise = data.get("noize", Def_val.noize)
+    manifest_path = data.get("manifest", Def_val.manifest)
+
+    match plan.protocol:
+        case "drive_encrypt" | "drive_decrypt":
+            par2disk = data.get("par2disk") or {}
+            rate = recovery(par2disk, Def_val.Par2disk.recovery_percent)
+            if plan.protocol == "drive_encrypt" and noise:
+                plan.add("noise", written=size)
+            else:
+                plan.add("par2", read=size)
+            if plan.protocol == "drive_encrypt":
+                plan_encrypt(plan, data, block_size, buffer_size, parse_size)
+                plan.add("par2", read=size, written=int(size * rate))
+            else:
+                plan_decrypt(plan, data, block_size, buffer_size, parse_size)
+        case "encrypt" | "encrypt_split" | "encryptrar":
+            par2 = data.get("par2") or {}
+            if plan.protocol != "encrypt" and data.get("unrar"):
+                plan.add("unrar", read=size, written=size, scratch=size)
+            if not os.path.exists(container_path):
+                plan.add("noise", written=size)
+            if plan.protocol == "encrypt" and par2:
+                plan.add("par2", read=size, written=int(size * recovery(par2, 20)))
+            plan_encrypt(plan, data, block_size, buffer_size, parse_size)
+            if plan.protocol == "encrypt_split":
+                plan.add("split", read=size, written=size, scratch=size)
+                if par2:
+                    plan.add("par2", read=size, written=int(size * recovery(par2, 20)))
+            if plan.protocol == "encryptrar":
+                rar_rate = recovery(data["rar"], 3)
+                plan.add("rar", read=size, written=int(size * (1 + rar_rate)), scratch=size)
+        case "decrypt" | "decryptrar":
+            if plan.protocol == "decryptrar":
+                plan.add("unrar", read=size, written=size, scratch=size)
+            elif os.path.exists(container_path + ".par2"):
+                plan.add("par2", read=size)
+            plan_decrypt(plan, data, block_size, buffer_size, parse_size)
+    if plan.protocol and manifest_path:
+        plan.add("manifest", read=size)
+
+    rates = throughputs(plan, buffer_size, io_size, int(data.get("workers", Def_val.workers)), cache_path, bench_path)
+    for stage in plan.stages:
+        if stage.name in rates and rates[stage.name]:
+            stage.seconds = stage.processed / (rates[stage.name] * 1024**2)
+        elif stage.processed:
+            plan.notes.append(f"no stored throughput for {stage.name}, not included in ETA")
+    plan.notes = list(dict.fromkeys(plan.notes))
+    return plan
+
+
+def format_size(size: int | None) -> str:
+    if size is None:
+        return "?"
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+def format_seconds(seconds: float | None) -> str:
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+
+def format_plan(plan: Plan) -> list[str]:
+    lines = [f"protocol: {plan.protocol or 'none'}",
+             f"container: {plan.container_path} ({format_size(plan.container_size)})"]
+    if plan.extents:
+        lines.append("layers:")
+        for name, start, end in plan.extents:
+            lines.append(f"  {name}: {start} - {end if end is not None else '?'}")
+    lines.append(f"{'stage':<10}{'layer':<9}{'read':>10}{'written':>10}{'scratch':>10}{'eta':>10}")
+    for stage in plan.stages:
+        lines.append(f"{stage.name:<10}{stage.layer:<9}{format_size(stage.read):>10}"
+                     f"{format_size(stage.written):>10}{format_size(stage.scratch):>10}"
+                     f"{format_seconds(stage.seconds):>10}")
+    lines.append(f"{'total':<19}{format_size(plan.read):>10}{format_size(plan.written):>10}"
+                 f"{format_size(plan.scratch):>10}{format_seconds(plan.seconds):>10}")
+    lines.extend(f"note: {note}" for note in plan.notes)
+    return lines
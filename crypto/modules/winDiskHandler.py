@@ -54,6 +54,10 @@ class DiskHandler:
     def close_disk(self):
         self.kernel32.CloseHandle(self.disk)
 
+    def flush(self):
+        if not self.kernel32.FlushFileBuffers(self.disk):
+            raise ctypes.WinError(ctypes.get_last_error())
+
     @staticmethod
     def penetrateMSFSprotection(disk_letter):
         from . import penetrateFSprotection as penFS
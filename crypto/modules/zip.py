@@ -4,16 +4,77 @@ import io
 import os
 import subprocess
 import shutil
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor
+import time
+import sys
+import zlib
+import hashlib
 from tqdm import tqdm
 import tempfile
 from modules import winDiskHandler
-from .constants import Msg
+from .container_io import ContainerWriter
+from .constants import Msg, Def_val
 from .wrapers.logging import logging
 from .config import process_rar_data, process_unrar_data
 from . import par2deep
 
 SECRET_EXTENSION = ".secret_shh"
 
+codecs = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+# already compressed formats: compressing them again costs CPU for nothing
+incompressible_extensions = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp4", ".mkv", ".mov", ".avi", ".webm", ".mp3", ".aac", ".ogg", ".flac",
+    ".zip", ".rar", ".7z", ".gz", ".bz2", ".xz", ".zst",
+    ".docx", ".xlsx", ".pptx", SECRET_EXTENSION,
+}
+sample_size = 16 * 1024
+# a sample that deflates to more than this share of its size is stored
+stored_ratio = 0.95
+
+
+def is_incompressible(path: str) -> bool:
+    if os.path.splitext(path)[1].lower() in incompressible_extensions:
+        return True
+    with open(path, 'rb') as f:
+        sample = f.read(sample_size)
+    # small files are cheap to compress whatever they hold
+    if len(sample) < sample_size:
+        return False
+    return len(zlib.compress(sample, 1)) > stored_ratio * len(sample)
+
+
+class CompressionPolicy:
+    # Codec and level of one layer; members that look incompressible are
+    # stored instead.
+    def __init__(self, codec: str = Def_val.compression, level: int | None = Def_val.compression_level) -> None:
+        if codec not in codecs:
+            logging.warning(Msg.Warn.unknown_compression(codec))
+            codec = Def_val.compression
+        self.codec = codec
+        self.compress_type = codecs[codec]
+        self.level = None if level is None else int(level)
+
+    @classmethod
+    def from_config(cls, encrypt_config) -> "CompressionPolicy":
+        return cls(encrypt_config.get("compression", Def_val.compression),
+                   encrypt_config.get("compression_level", Def_val.compression_level))
+
+    def choose(self, path: str) -> tuple[int, int | None]:
+        if self.compress_type == zipfile.ZIP_STORED or is_incompressible(path):
+            return zipfile.ZIP_STORED, None
+        return self.compress_type, self.level
+
+    def write(self, zipf, path: str, arcname: str) -> None:
+        compress_type, level = self.choose(path)
+        zipf.write(path, arcname, compress_type=compress_type, compresslevel=level)
+
 def rar_container(raw_rar_data, par2_data, container_path: str) -> bool:
     rar_data = process_rar_data(raw_rar_data)
     archive_path = rar_data["archive_path"]
@@ -138,6 +199,7 @@ def read_archive(container_path: str, offset: int, size: int, buffer_size: int,
                     pbar.update(read_size)
 
             handle.close_disk()
+        temp_file.flush()
         return temp_file
     except Exception as e:
         logging.error(Msg.Err.reading_archive_error(e))
@@ -146,7 +208,7 @@ def read_archive(container_path: str, offset: int, size: int, buffer_size: int,
             os.remove(temp_file.name)
 
 def extra_decompress(archive_path: str, output_path: str) -> None:
-    dir_path = archive_path.replace(SECRET_EXTENSION, "")
+    dir_path = os.path.basename(archive_path).replace(SECRET_EXTENSION, "")
     output_dir_path = os.path.join(output_path, dir_path)
 
     if os.path.exists(output_dir_path):
@@ -163,35 +225,88 @@ def extra_decompress(archive_path: str, output_path: str) -> None:
     except Exception as e:
         logging.error(Msg.Err.extracting_directory_error(e))
 
+def extract_members(zipf, output_path: str, file_list=None) -> None:
+    if file_list is None:
+        file_list = zipf.namelist()
+    with tqdm(total=len(file_list), desc=Msg.PBar.extracting_file, unit="file") as pbar:
+        for file_to_extract in file_list:
+            root, extension = os.path.splitext(file_to_extract)
+            if extension == SECRET_EXTENSION:
+                # a scratch folder inside output_path keeps layers that are
+                # decrypted side by side from sharing the RAR copy
+                scratch = tempfile.mkdtemp(dir=output_path)
+                try:
+                    extra_decompress(zipf.extract(file_to_extract, path=scratch), output_path)
+                finally:
+                    shutil.rmtree(scratch, ignore_errors=True)
+                pbar.update(1)
+                continue
+            zipf.extract(file_to_extract, path=output_path)
+            logging.info(Msg.Info.file_extracted(file_to_extract))
+            pbar.update(1)
+
 def unzip_archive(container_path: str, offset: int, size: int, output_path: str, buffer_size: int, isDisk: bool) -> None:
     temp_file = None
-    extra_file = ""
     try:
         temp_file = read_archive(container_path, offset, size, buffer_size, isDisk)
         with zipfile.ZipFile(temp_file.name, 'r') as zipf:
-            file_list = zipf.namelist()
-            with tqdm(total=len(file_list), desc=Msg.PBar.extracting_file, unit="file") as pbar:
-                for file_to_extract in file_list:
-                    root, extension = os.path.splitext(file_to_extract)
-                    if extension == SECRET_EXTENSION:
-                        zipf.extract(file_to_extract, path=".")
-                        extra_file = file_to_extract
-                        extra_decompress(extra_file, output_path)
-                        pbar.update(1)
-                        continue
-                    zipf.extract(file_to_extract, path=output_path)
-                    logging.info(Msg.Info.file_extracted(file_to_extract))
-                    pbar.update(1)
+            extract_members(zipf, output_path)
     except Exception as e:
         logging.error(Msg.Err.processing_archive_error(e))
     finally:
         if temp_file:
             temp_file.close()
             os.remove(temp_file.name)
-            if os.path.exists(extra_file):
-                os.remove(extra_file)
 
-def write_zip_to_cont(container_path: str, zip_path: str, offset: int, buffer_size: int, isDisk: bool) -> int:
+def unzip_stream(source, output_path: str) -> None:
+    # source is any seekable file object, e.g. aes.DecryptReader over a layer
+    try:
+        with zipfile.ZipFile(source, 'r') as zipf:
+            extract_members(zipf, output_path)
+    except Exception as e:
+        logging.error(Msg.Err.processing_archive_error(e))
+
+def match_members(zipf, pattern: str) -> list[str]:
+    # the pattern matches either the full member path or its base name
+    return [name for name in zipf.namelist()
+            if fnmatch.fnmatch(name, pattern)
+            or fnmatch.fnmatch(os.path.basename(name.rstrip("/")), pattern)]
+
+def extract_stream(source, output_path: str, pattern: str) -> int:
+    # Only the central directory and the matched members are read from
+    # source, so with aes.DecryptReader only their units are decrypted.
+    try:
+        with zipfile.ZipFile(source, 'r') as zipf:
+            file_list = match_members(zipf, pattern)
+            if file_list:
+                extract_members(zipf, output_path, file_list)
+            return len(file_list)
+    except Exception as e:
+        logging.error(Msg.Err.processing_archive_error(e))
+        return 0
+
+def list_stream(source) -> list[zipfile.ZipInfo]:
+    # zipfile only reads the end-of-central-directory record and the
+    # central directory when opening, member data is never touched
+    try:
+        with zipfile.ZipFile(source, 'r') as zipf:
+            return zipf.infolist()
+    except Exception as e:
+        logging.error(Msg.Err.processing_archive_error(e))
+        return []
+
+def format_listing(entries) -> list[str]:
+    lines = []
+    for info in entries:
+        timestamp = "{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(*info.date_time)
+        lines.append(f"{timestamp} {info.file_size:>14} {info.compress_size:>14} {info.CRC:08x} {info.filename}")
+    return lines
+
+def write_zip_to_cont(container_path: str, zip_path: str, offset: int, buffer_size: int, isDisk: bool, aes_obj=None) -> int:
+    if aes_obj is not None:
+        with open(zip_path, 'rb') as f:
+            return aes_obj.write_encrypted(
+                container_path, f, offset, os.fstat(f.fileno()).st_size)
 
     with open(zip_path, 'rb') as f:
         f.seek(0)
@@ -266,7 +381,8 @@ def process_subdirs(root, sub_dirs, zipf) -> None:
         logging.info(Msg.Info.added_directory(sub_dir_path))
 
 
-def process_subfiles(root, dir, files, zipf, pbar) -> bool:
+def process_subfiles(root, dir, files, zipf, pbar, policy=None) -> bool:
+    policy = policy or CompressionPolicy()
     is_empty = True
     for file in files:
         is_empty = False
@@ -274,7 +390,7 @@ def process_subfiles(root, dir, files, zipf, pbar) -> bool:
         arcname = os.path.relpath(
             file_path, start=os.path.dirname(dir))
         try:
-            zipf.write(file_path, arcname)
+            policy.write(zipf, file_path, arcname)
             logging.info(
                 Msg.Info.added_file(file_path))
             pbar.update(1)
@@ -289,7 +405,11 @@ def extra_compress(dictionary_size: str, dir_path: str, archive_name: str, zipf)
     try:
         result = subprocess.run(command, capture_output=True, text=True)
         if result.returncode == 0:
-            zipf.write(archive_name, os.path.basename(archive_name))
+            # the RAR archive is already compressed
+            zipf.write(archive_name, os.path.basename(archive_name), compress_type=zipfile.ZIP_STORED)
+            # the member set travels in the entry comment, so an update can
+            # tell that a file was removed from the directory
+            zipf.getinfo(os.path.basename(archive_name)).comment = extra_members(dir_path)
             logging.info(Msg.Info.added_directory(dir_path))
         if result.returncode != 0:
             logging.error(Msg.Err.adding_directory_to_archive_error(dir_path, result.stderr))
@@ -300,9 +420,151 @@ def extra_compress(dictionary_size: str, dir_path: str, archive_name: str, zipf)
             os.remove(archive_name)
 
 
-def zip_archive(container_path: str, offset: int, files, directories, extra_dir: str, buffer_size: int, isDisk: bool) -> int:
-    bytes_written = 0
+# compressed members up to this size travel back from a worker in memory,
+# larger ones through a temporary file
+member_spool_limit = 8 * 1024 * 1024
+
 
+def compress_member(path: str, compress_type: int, level: int | None, spool_limit: int = member_spool_limit) -> tuple:
+    # Runs in a worker: (crc, file_size, compress_size, data, temp_path) with
+    # the data compressed exactly as zipf.write would compress it.
+    compressor = zipfile._get_compressor(compress_type, level)
+    crc = file_size = compress_size = 0
+    spool = io.BytesIO()
+    temp_file = None
+
+    def emit(data):
+        nonlocal spool, temp_file, compress_size
+        if not data:
+            return
+        compress_size += len(data)
+        if temp_file is None and spool.tell() + len(data) > spool_limit:
+            temp_file = tempfile.NamedTemporaryFile(delete=False)
+            temp_file.write(spool.getvalue())
+            spool = None
+        (temp_file or spool).write(data)
+
+    try:
+        with open(path, 'rb') as f:
+            while block := f.read(1024 * 1024):
+                crc = zlib.crc32(block, crc)
+                file_size += len(block)
+                emit(compressor.compress(block) if compressor else block)
+        if compressor:
+            emit(compressor.flush())
+    except BaseException:
+        if temp_file is not None:
+            temp_file.close()
+            os.remove(temp_file.name)
+        raise
+    if temp_file is not None:
+        temp_file.close()
+        return crc, file_size, compress_size, None, temp_file.name
+    return crc, file_size, compress_size, spool.getvalue(), None
+
+
+class MemberZipFile(zipfile.ZipFile):
+    # ZipFile that also appends members compressed by compress_member.
+    # zipfile has no public call for that, so write_compressed goes through
+    # its internals; they are only used on the versions in raw_versions,
+    # elsewhere the members are compressed serially by ZipFile.write.
+    raw_versions = ((3, 8), (3, 13))
+
+    @classmethod
+    def raw_supported(cls) -> bool:
+        return cls.raw_versions[0] <= sys.version_info[:2] <= cls.raw_versions[1]
+
+    def write_compressed(self, path: str, arcname: str, compress_type: int, result: tuple) -> None:
+        # The local header ends up as ZipFile.write leaves it on a seekable
+        # file. A failed write is cut off again, so the member neither shows
+        # up in the archive nor leaves bytes before the central directory.
+        crc, file_size, compress_size, data, temp_path = result
+        try:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            zinfo.compress_type = compress_type
+            zinfo.file_size = file_size
+            zinfo.compress_size = compress_size
+            zinfo.CRC = crc
+            zinfo.flag_bits = 0x02 if compress_type == zipfile.ZIP_LZMA else 0x00
+            if not zinfo.external_attr:
+                zinfo.external_attr = 0o600 << 16
+            zip64 = file_size * 1.05 > zipfile.ZIP64_LIMIT
+            self._writecheck(zinfo)
+
+            self.fp.seek(self.start_dir)
+            zinfo.header_offset = self.start_dir
+            self._didModify = True
+            try:
+                self.fp.write(zinfo.FileHeader(zip64))
+                if data is not None:
+                    self.fp.write(data)
+                else:
+                    with open(temp_path, 'rb') as f:
+                        shutil.copyfileobj(f, self.fp, 1024 * 1024)
+            except BaseException:
+                self.fp.seek(self.start_dir)
+                self.fp.truncate()
+                raise
+        finally:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.start_dir = self.fp.tell()
+        self.filelist.append(zinfo)
+        self.NameToInfo[zinfo.filename] = zinfo
+
+
+def write_members_parallel(zipf: MemberZipFile, entries: dict, policy: CompressionPolicy, workers: int, pbar) -> None:
+    # Members are compressed in a process pool and appended by this single
+    # writer in the order of entries, so the archive is the same as the
+    # serial one. At most 2 * workers compressed members wait in memory.
+    window = workers * 2
+    items = list(entries.items())
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        submitted = 0
+
+        def submit_next():
+            nonlocal submitted
+            while submitted < len(items) and len(pending) < window:
+                name, path = items[submitted]
+                if path is None:
+                    pending.append((name, path, None, None))
+                else:
+                    compress_type, level = policy.choose(path)
+                    pending.append((name, path, compress_type,
+                                    pool.submit(compress_member, path, compress_type, level, member_spool_limit)))
+                submitted += 1
+
+        submit_next()
+        try:
+            while pending:
+                name, path, compress_type, future = pending.pop(0)
+                if path is None:
+                    zipf.writestr(name, '')
+                    logging.info(Msg.Info.added_directory(name))
+                else:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # like the serial path, a file that cannot be read
+                        # is reported and left out
+                        logging.error(Msg.Err.adding_file_error(path, e))
+                    else:
+                        zipf.write_compressed(path, name, compress_type, result)
+                        logging.info(Msg.Info.added_file(path))
+                    pbar.update(1)
+                submit_next()
+        finally:
+            # drop temporary files of members that were never written
+            for _, _, _, future in pending:
+                if future is not None and not future.cancel() and future.exception() is None:
+                    temp_path = future.result()[4]
+                    if temp_path is not None and os.path.exists(temp_path):
+                        os.remove(temp_path)
+
+
+def zip_archive(container_path: str, offset: int, files, directories, extra_dir: str, buffer_size: int, isDisk: bool, aes_obj=None,
+                policy: CompressionPolicy | None = None, workers: int = 1) -> int:
     def check_archive(zipf):
         logging.info(Msg.Info.validating_archive)
         res = zipf.testzip()
@@ -311,10 +573,12 @@ def zip_archive(container_path: str, offset: int, files, directories, extra_dir:
         else:
             logging.warning(Msg.Warn.archive_integrity_check_failed(res))
 
-    #temp_file = tempfile.NamedTemporaryFile(delete=False)
-    tempfile = "temp.zip"
+    policy = policy or CompressionPolicy()
+    # the archive is built straight inside the container range, no temp.zip
+    writer = ContainerWriter(container_path, offset,
+                             buffer_size, isDisk, aes_obj)
     try:
-        with zipfile.ZipFile(tempfile, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        with MemberZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as zipf:
 
             total_files = len(files) + sum(len(files)
                                            for d in directories for _, _, files in os.walk(d))
@@ -323,10 +587,14 @@ def zip_archive(container_path: str, offset: int, files, directories, extra_dir:
                 total_files += 1
 
             with tqdm(total=total_files, desc=Msg.PBar.adding_to_archive, unit="file") as pbar:
+                if workers > 1 and MemberZipFile.raw_supported():
+                    write_members_parallel(zipf, source_entries(files, directories), policy, workers, pbar)
+                    files, directories = [], []
+
                 for file in files:
                     if file != "":
                         try:
-                            zipf.write(file, os.path.basename(file))
+                            policy.write(zipf, file, os.path.basename(file))
                             logging.info(Msg.Info.file_added_to_archive(file))
                             pbar.update(1)
                         except Exception as e:
@@ -340,7 +608,7 @@ def zip_archive(container_path: str, offset: int, files, directories, extra_dir:
                         for root, sub_dirs, files in os.walk(dir):
                             process_subdirs(root, sub_dirs, zipf)
                             is_empty = process_subfiles(
-                                root, dir, files, zipf, pbar)
+                                root, dir, files, zipf, pbar, policy)
                         if is_empty:
                             arcname = os.path.relpath(
                                 dir, start=os.path.dirname(dir)) + '/'
@@ -352,13 +620,168 @@ def zip_archive(container_path: str, offset: int, files, directories, extra_dir:
                     extra_compress("524m", extra_dir, archive_name, zipf)
                     pbar.update(1)
 
-
-
             check_archive(zipf)
     except Exception as e:
-        logging.error(Msg.Err.processing_archive_error(e))
+        if not writer.overflow:
+            logging.error(Msg.Err.processing_archive_error(e))
+            return 0
+    finally:
+        writer.close()
+    # the member handlers log and go on, so running out of room is checked
+    # here even when the central directory still fitted
+    if writer.overflow:
+        logging.error(Msg.Err.archive_does_not_fit_layer(writer.limit))
         return 0
+    return writer.size
+
+
+def source_entries(files, directories) -> dict[str, str | None]:
+    # arcname -> source path (None for directory entries), named the way
+    # zip_archive, process_subdirs and process_subfiles name them
+    entries = {}
+    for file in files:
+        if file != "":
+            entries[os.path.basename(file)] = file
+    for dir in directories:
+        if os.path.isdir(dir):
+            is_empty = True
+            for root, sub_dirs, dir_files in os.walk(dir):
+                for sub_dir in sub_dirs:
+                    entries[os.path.relpath(os.path.join(root, sub_dir),
+                                            start=os.path.dirname(sub_dir)) + '/'] = None
+                # like zip_archive, only the last walked directory decides
+                is_empty = not dir_files
+                for file in dir_files:
+                    file_path = os.path.join(root, file)
+                    entries[os.path.relpath(file_path, start=os.path.dirname(dir))] = file_path
+            if is_empty:
+                entries[os.path.relpath(dir, start=os.path.dirname(dir)) + '/'] = None
+    return entries
+
+
+def zip_date_time(path: str) -> tuple:
+    # ZIP stores modification times with two-second resolution
+    date_time = time.localtime(os.stat(path).st_mtime)[:6]
+    return date_time[:5] + (date_time[5] // 2 * 2,)
+
+
+def file_crc(path: str, buffer_size: int) -> int:
+    crc = 0
+    with open(path, 'rb') as f:
+        while block := f.read(buffer_size):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def member_changed(info: zipfile.ZipInfo, path: str, buffer_size: int) -> bool:
+    # size and time first; the CRC is only computed when the time moved
+    if os.path.getsize(path) != info.file_size:
+        return True
+    if zip_date_time(path) == info.date_time:
+        return False
+    return file_crc(path, buffer_size) != info.CRC
+
+
+def extra_members(extra_dir: str) -> bytes:
+    # digest of the relative paths under the directory
+    names = []
+    for root, dirs, files in os.walk(extra_dir):
+        for name in dirs:
+            names.append(os.path.relpath(os.path.join(root, name), extra_dir) + "/")
+        for name in files:
+            names.append(os.path.relpath(os.path.join(root, name), extra_dir))
+    return hashlib.sha256("\n".join(sorted(names)).encode('utf-8')).hexdigest().encode('ascii')
+
+
+def extra_changed(info: zipfile.ZipInfo, extra_dir: str) -> bool:
+    # an archive written before the member set was recorded is rebuilt once
+    if info.comment != extra_members(extra_dir):
+        return True
+    for root, _, files in os.walk(extra_dir):
+        for file in files:
+            if zip_date_time(os.path.join(root, file)) > info.date_time:
+                return True
+    return False
+
+
+def member_span(info: zipfile.ZipInfo) -> int:
+    # local header, data and data descriptor of one member
+    span = zipfile.sizeFileHeader + len(info.filename.encode('utf-8')) + len(info.extra) + info.compress_size
+    if info.flag_bits & 0x08:
+        span += 24 if info.file_size > zipfile.ZIP64_LIMIT else 16
+    return span
+
+
+def dead_bytes(zipf, removed) -> int:
+    # bytes of the member area no longer referenced once removed is dropped,
+    # including members dropped by earlier updates
+    live = sum(member_span(info) for info in zipf.filelist if info.filename not in removed)
+    return max(zipf.start_dir - live, 0)
+
+
+def update_archive(container_path: str, offset: int, size: int, files, directories, extra_dir: str,
+                   buffer_size: int, isDisk: bool, aes_obj, compact_ratio: float,
+                   policy: CompressionPolicy | None = None) -> tuple[int, int, int] | None:
+    # Brings an existing layer archive in line with the sources. Unchanged
+    # members stay where they are; changed and new members are appended in
+    # place of the old central directory, which is written again after them,
+    # so only the units from there on are re-encrypted. Returns (new size,
+    # changed members, removed members), or None when the layer should be
+    # rebuilt because it is unreadable or too much of it would be dead space.
+    policy = policy or CompressionPolicy()
+    writer = ContainerWriter(container_path, offset, buffer_size, isDisk, aes_obj, size=size)
+    try:
+        # append mode takes a stream without a central directory for an empty
+        # archive and writes after it, so the layer is validated first
+        try:
+            zipfile.ZipFile(writer, 'r').close()
+            writer.seek(0)
+            zipf = zipfile.ZipFile(writer, 'a', zipfile.ZIP_DEFLATED)
+        except zipfile.BadZipFile:
+            return None
+        with zipf:
+            entries = source_entries(files, directories)
+            extra_name = ""
+            if extra_dir != "" and os.path.isdir(extra_dir):
+                extra_name = os.path.basename(extra_dir) + SECRET_EXTENSION
+
+            stored = {info.filename: info for info in zipf.filelist}
+            removed = {name for name in stored if name not in entries and name != extra_name}
+            added = []
+            for name, path in entries.items():
+                if name not in stored:
+                    added.append(name)
+                elif path is not None and member_changed(stored[name], path, buffer_size):
+                    added.append(name)
+                    removed.add(name)
+            rebuild_extra = extra_name != "" and (
+                extra_name not in stored or extra_changed(stored[extra_name], extra_dir))
+            if rebuild_extra and extra_name in stored:
+                removed.add(extra_name)
+
+            if not added and not removed and not rebuild_extra:
+                return size, 0, 0
+            if dead_bytes(zipf, removed) > compact_ratio * size:
+                return None
+
+            zipf.filelist = [info for info in zipf.filelist if info.filename not in removed]
+            for name in removed:
+                del zipf.NameToInfo[name]
+            # dropping entries alone must still rewrite the central directory
+            zipf._didModify = True
+
+            for name in added:
+                if entries[name] is None:
+                    zipf.writestr(name, '')
+                    logging.info(Msg.Info.added_directory(name))
+                else:
+                    policy.write(zipf, entries[name], name)
+                    logging.info(Msg.Info.file_added_to_archive(entries[name]))
+            if rebuild_extra:
+                extra_compress("524m", extra_dir, extra_name, zipf)
+            changed = len(added) + int(rebuild_extra)
+            removed_count = len(removed) - len([name for name in added if name in stored]) \
+                - int(rebuild_extra and extra_name in stored)
     finally:
-        bytes_written = write_zip_to_cont(container_path, tempfile, offset, buffer_size, isDisk)
-        os.remove(tempfile)
-        return bytes_written
\ No newline at end of file
+        writer.close()
+    return writer.size, changed, removed_count
@@ -82,3 +82,1093 @@ def test_aes_different_sizes(disk_path: str, temp_container: str, random_data, d
             result = f.read()
 
     assert result == test_data
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+@pytest.mark.parametrize("start_pos", [0, 1000])
+def test_aes_parallel_matches_serial(temp_container: str, workers: int, start_pos: int) -> None:
+    buffer_size = 4096
+    test_data = os.urandom(buffer_size * 10 + 700)
+    end_pos = start_pos + len(test_data) - start_pos // 2
+    password = "test_password"
+
+    with open(temp_container, "wb") as f:
+        f.write(test_data)
+
+    logger.info(f"Encrypting serially and with {workers} workers")
+    aes.Aes(buffer_size).process_file_part(
+        temp_container, password, start_pos, end_pos, aes.Mode.Encrypt)
+    with open(temp_container, "rb") as f:
+        serial = f.read()
+
+    with open(temp_container, "wb") as f:
+        f.write(test_data)
+    aes_obj = aes.Aes(buffer_size, False, workers)
+    aes_obj.process_file_part(
+        temp_container, password, start_pos, end_pos, aes.Mode.Encrypt)
+    with open(temp_container, "rb") as f:
+        parallel = f.read()
+
+    assert parallel == serial
+
+    aes_obj.process_file_part(
+        temp_container, password, start_pos, end_pos, aes.Mode.Decrypt)
+    with open(temp_container, "rb") as f:
+        assert f.read() == test_data
+
+
+@pytest.mark.parametrize("mode", [aes.Mode.Encrypt, aes.Mode.Decrypt])
+def test_aes_pipeline_matches_serial(temp_container: str, mode) -> None:
+    buffer_size = 4096
+    test_data = os.urandom(buffer_size * 20 + 123)
+    password = "test_password"
+
+    with open(temp_container, "wb") as f:
+        f.write(test_data)
+    aes.Aes(buffer_size).process_file_part(
+        temp_container, password, 17, len(test_data), mode)
+    with open(temp_container, "rb") as f:
+        serial = f.read()
+
+    with open(temp_container, "wb") as f:
+        f.write(test_data)
+    aes.Aes(buffer_size, pipeline=True).process_file_part(
+        temp_container, password, 17, len(test_data), mode)
+    with open(temp_container, "rb") as f:
+        pipelined = f.read()
+
+    assert pipelined == serial
+
+
+def test_key_schedule_matches_per_call_kdf(temp_container: str) -> None:
+    from modules import keys
+
+    passwords = ["12", "123", "test_password"]
+    schedules = keys.derive_schedules(passwords)
+    assert list(schedules) == passwords
+
+    test_data = os.urandom(4096 * 3)
+    for password, schedule in schedules.items():
+        assert schedule.header_iv == keys.derive_header_iv(password)
+
+        with open(temp_container, "wb") as f:
+            f.write(test_data)
+        aes.Aes(4096).process_file_part(
+            temp_container, password, 0, len(test_data), aes.Mode.Encrypt)
+        with open(temp_container, "rb") as f:
+            expected = f.read()
+
+        with open(temp_container, "wb") as f:
+            f.write(test_data)
+        aes.Aes(4096).process_file_part(
+            temp_container, "", 0, len(test_data), aes.Mode.Encrypt, schedule)
+        with open(temp_container, "rb") as f:
+            assert f.read() == expected
+
+
+def test_decrypt_reader_is_read_only(temp_container: str) -> None:
+    import io
+    import zipfile
+
+    buffer_size = 4096
+    offset = 777
+    members = {f"file{i}.bin": os.urandom(3000 * (i + 1)) for i in range(4)}
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for name, data in members.items():
+            zipf.writestr(name, data)
+    archive = archive.getvalue()
+
+    with open(temp_container, "wb") as f:
+        f.write(os.urandom(offset) + archive + os.urandom(100))
+    aes_obj = aes.Aes(buffer_size)
+    aes_obj.process_file_part(temp_container, "test_password",
+                              offset, offset + len(archive), aes.Mode.Encrypt)
+    with open(temp_container, "rb") as f:
+        encrypted = f.read()
+
+    with aes_obj.open_reader(temp_container, "test_password",
+                             offset, offset + len(archive)) as reader:
+        assert reader.read() == archive
+        reader.seek(-30, os.SEEK_END)
+        assert reader.read(10) == archive[-30:-20]
+        with zipfile.ZipFile(reader) as zipf:
+            for name, data in members.items():
+                assert zipf.read(name) == data
+
+    with open(temp_container, "rb") as f:
+        assert f.read() == encrypted
+
+
+@pytest.mark.parametrize("offset", [0, 1000, 4096])
+def test_fused_write_matches_copy_then_encrypt(temp_container: str, offset: int) -> None:
+    from modules import zip
+
+    buffer_size = 4096
+    payload = os.urandom(buffer_size * 5 + 333)
+    noise = os.urandom(offset + len(payload) + 500)
+    payload_path = temp_container + ".zip"
+    with open(payload_path, "wb") as f:
+        f.write(payload)
+
+    try:
+        with open(temp_container, "wb") as f:
+            f.write(noise)
+        zip.write_zip_to_cont(temp_container, payload_path,
+                              offset, buffer_size, False)
+        aes.Aes(buffer_size).process_file_part(
+            temp_container, "test_password", offset, offset + len(payload), aes.Mode.Encrypt)
+        with open(temp_container, "rb") as f:
+            expected = f.read()
+
+        with open(temp_container, "wb") as f:
+            f.write(noise)
+        aes_obj = aes.Aes(buffer_size)
+        aes_obj.init_cipher("test_password")
+        written = zip.write_zip_to_cont(temp_container, payload_path,
+                                        offset, buffer_size, False, aes_obj)
+        with open(temp_container, "rb") as f:
+            assert f.read() == expected
+        assert written == len(payload)
+    finally:
+        os.remove(payload_path)
+
+
+@pytest.mark.parametrize("encrypted", [False, True])
+def test_container_writer_matches_temp_zip(temp_container: str, encrypted: bool) -> None:
+    import io
+    import zipfile
+    from modules.container_io import ContainerWriter
+
+    buffer_size = 4096
+    offset = 1500
+    noise = os.urandom(200 * 1024)
+    members = {f"file{i}.bin": os.urandom(30000) + bytes(5000) for i in range(3)}
+
+    def build(fp):
+        with zipfile.ZipFile(fp, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for name, member_data in members.items():
+                info = zipfile.ZipInfo(name, (2024, 1, 1, 0, 0, 0))
+                info.compress_type = zipfile.ZIP_DEFLATED
+                zipf.writestr(info, member_data)
+            assert zipf.testzip() is None
+
+    expected_zip = io.BytesIO()
+    build(expected_zip)
+    expected_zip = expected_zip.getvalue()
+
+    with open(temp_container, "wb") as f:
+        f.write(noise)
+    aes_obj = None
+    if encrypted:
+        aes_obj = aes.Aes(buffer_size)
+        aes_obj.init_cipher("test_password")
+
+    writer = ContainerWriter(temp_container, offset, buffer_size, False, aes_obj)
+    build(writer)
+    writer.close()
+    assert writer.size == len(expected_zip)
+
+    with open(temp_container, "rb") as f:
+        data = f.read()
+    assert data[:offset] == noise[:offset]
+    assert data[offset + writer.size:] == noise[offset + writer.size:]
+
+    if encrypted:
+        aes.Aes(buffer_size).process_file_part(
+            temp_container, "test_password", offset, offset + writer.size, aes.Mode.Decrypt)
+        with open(temp_container, "rb") as f:
+            data = f.read()
+    assert data[offset:offset + writer.size] == expected_zip
+
+
+def test_buffer_calibration_cache(temp_container: str, tmp_path, monkeypatch) -> None:
+    from modules import calibrate
+
+    container_size = 4 * 1024 * 1024
+    with open(temp_container, "wb") as f:
+        f.write(os.urandom(container_size))
+    cache_path = str(tmp_path / "calibration.json")
+
+    results = calibrate.probe(temp_container, False, container_size)
+    assert results
+    assert all(size % 512 == 0 for size in results)
+
+    buffer_size = calibrate.calibrate(temp_container, False, container_size, cache_path)
+    assert buffer_size in calibrate.candidates
+    identity = calibrate.device_identity(temp_container, False, container_size)
+    assert calibrate.load_cache(cache_path)[identity]["buffer_size"] == buffer_size
+
+    def no_probe(*args):
+        raise AssertionError("probe must not run for a cached device")
+
+    monkeypatch.setattr(calibrate, "probe", no_probe)
+    assert calibrate.calibrate(temp_container, False, container_size, cache_path) == buffer_size
+
+
+def test_calibration_probes_the_hash_read_path(temp_container: str, monkeypatch) -> None:
+    from modules import calibrate, hashing
+
+    container_size = 2 * 1024 * 1024
+    with open(temp_container, "wb") as f:
+        f.write(os.urandom(container_size))
+    read_sizes = []
+    hash_range = hashing.hash_range
+
+    def recording(file_path, disk_mode, buffer_size, *args, **kwargs):
+        read_sizes.append(buffer_size)
+        return hash_range(file_path, disk_mode, buffer_size, *args, **kwargs)
+
+    monkeypatch.setattr(hashing, "hash_range", recording)
+    results = calibrate.probe(temp_container, False, container_size, "blake2b")
+    assert sorted(results) == read_sizes == [size for size in calibrate.candidates if size <= container_size]
+
+
+def test_extract_decrypts_only_matched_members(temp_container: str, tmp_path) -> None:
+    import io
+    import zipfile
+    from modules import zip
+
+    buffer_size = 4096
+    offset = 1234
+    members = {f"dir/file{i}.bin": os.urandom(20000) for i in range(20)}
+    members["dir/notes.txt"] = b"only this one"
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zipf:
+        for name, data in members.items():
+            zipf.writestr(name, data)
+    archive = archive.getvalue()
+
+    with open(temp_container, "wb") as f:
+        f.write(os.urandom(offset) + archive + os.urandom(100))
+    aes_obj = aes.Aes(buffer_size)
+    aes_obj.process_file_part(temp_container, "test_password",
+                              offset, offset + len(archive), aes.Mode.Encrypt)
+
+    output = tmp_path / "out"
+    with aes_obj.open_reader(temp_container, "test_password",
+                             offset, offset + len(archive)) as reader:
+        assert zip.extract_stream(reader, str(output), "*.txt") == 1
+        assert reader.bytes_read < len(archive) // 4
+
+    assert (output / "dir" / "notes.txt").read_bytes() == b"only this one"
+    assert sorted(p.name for p in (output / "dir").iterdir()) == ["notes.txt"]
+
+
+def test_list_reads_only_central_directory(temp_container: str) -> None:
+    import io
+    import zipfile
+    import zlib
+    from modules import zip
+
+    buffer_size = 4096
+    offset = 321
+    members = {f"file{i}.bin": os.urandom(10000) for i in range(30)}
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zipf:
+        for name, data in members.items():
+            zipf.writestr(name, data)
+    archive = archive.getvalue()
+
+    with open(temp_container, "wb") as f:
+        f.write(os.urandom(offset) + archive)
+    aes_obj = aes.Aes(buffer_size)
+    aes_obj.process_file_part(temp_container, "test_password",
+                              offset, offset + len(archive), aes.Mode.Encrypt)
+
+    with aes_obj.open_reader(temp_container, "test_password",
+                             offset, offset + len(archive)) as reader:
+        entries = zip.list_stream(reader)
+        assert reader.bytes_read <= 2 * buffer_size
+
+    assert [info.filename for info in entries] == list(members)
+    lines = zip.format_listing(entries)
+    assert len(lines) == len(members)
+    assert lines[0].endswith(" file0.bin")
+    assert f"{zlib.crc32(members['file0.bin']):08x}" in lines[0]
+
+
+@pytest.mark.parametrize("threads", [1, 3])
+@pytest.mark.parametrize("total", [0, 1000, 4096 * 7, 4096 * 7 + 100])
+def test_keystream_noise_is_one_ctr_stream(threads: int, total: int) -> None:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from modules import noise
+
+    buffer_size = 4096
+    source = noise.KeystreamNoise(threads)
+    positions = []
+    data = bytearray()
+    for position, chunk in source.chunks(total, buffer_size):
+        positions.append(position)
+        data += chunk
+
+    assert positions == list(range(0, total, buffer_size))
+    counter = source.nonce.to_bytes(16, "big")
+    expected = Cipher(algorithms.AES(source.key), modes.CTR(counter)).encryptor().update(bytes(total))
+    assert bytes(data) == expected
+
+
+def test_noise_checkpoint_round_trip(tmp_path) -> None:
+    from modules import noise
+
+    checkpoint = str(tmp_path / "noise_checkpoint.json")
+    identity = noise.checkpoint_identity("container.bin", False)
+    assert noise.load_checkpoint(checkpoint, identity, 10 * 4096, 4096) == 0
+
+    noise.save_checkpoint(checkpoint, identity, 10 * 4096, 6 * 4096)
+    assert noise.load_checkpoint(checkpoint, identity, 10 * 4096, 4096) == 6 * 4096
+    # another target, size or buffer size starts from scratch
+    assert noise.load_checkpoint(checkpoint, "file:other", 10 * 4096, 4096) == 0
+    assert noise.load_checkpoint(checkpoint, identity, 11 * 4096, 4096) == 0
+    assert noise.load_checkpoint(checkpoint, identity, 10 * 4096, 4 * 4096) == 0
+
+    noise.clear_checkpoint(checkpoint)
+    assert not os.path.exists(checkpoint)
+
+    source = noise.SecretsNoise()
+    assert [p for p, _ in source.chunks(10 * 4096, 4096, 6 * 4096)] == [6 * 4096, 7 * 4096, 8 * 4096, 9 * 4096]
+
+
+@pytest.mark.parametrize("algorithm", ["crc32", "blake2b"])
+@pytest.mark.parametrize("start_pos, end_pos", [(0, 300000), (1234, 250001)])
+def test_parallel_hash_matches_serial(temp_container: str, algorithm: str, start_pos: int, end_pos: int) -> None:
+    import zlib
+    from modules import hashing
+
+    data = os.urandom(300000)
+    with open(temp_container, "wb") as f:
+        f.write(data)
+
+    leaf_size = 64 * 1024
+    digests = {hashing.hash_range(temp_container, False, 4096, start_pos, end_pos,
+                                  algorithm, threads, leaf_size)
+               for threads in (1, 4)}
+    digests.add(hashing.hash_range(temp_container, False, 10000, start_pos, end_pos,
+                                   algorithm, 3, leaf_size))
+    assert len(digests) == 1
+    if algorithm == "crc32":
+        assert digests == {hex(zlib.crc32(data[start_pos:end_pos]))[2:]}
+
+
+def test_crc32_combine() -> None:
+    import zlib
+    from modules import hashing
+
+    first, second = os.urandom(1000), os.urandom(777)
+    combined = hashing.crc32_combine(zlib.crc32(first), zlib.crc32(second), len(second))
+    assert combined == zlib.crc32(first + second)
+    assert hashing.crc32_combine(zlib.crc32(first), 0, 0) == zlib.crc32(first)
+
+
+def test_manifest_names_damaged_blocks(temp_container: str, tmp_path) -> None:
+    from modules import manifest
+
+    block_size = 4096
+    size = block_size * 37 + 100
+    with open(temp_container, "wb") as f:
+        f.write(os.urandom(size))
+    stored = manifest.build(temp_container, False, 1024, size, block_size, threads=3)
+
+    sidecar = str(tmp_path / "container.manifest")
+    manifest.save(stored, sidecar, "layer_password")
+    assert manifest.load(sidecar, ["wrong"]) is None
+    loaded = manifest.load(sidecar, ["wrong", "layer_password"])
+    assert loaded.root == stored.root
+
+    with open(temp_container, "r+b") as f:
+        for offset in (5, block_size * 20 + 7, size - 1):
+            f.seek(offset)
+            flipped = b"\xff" if f.read(1) != b"\xff" else b"\x00"
+            f.seek(offset)
+            f.write(flipped)
+    current = manifest.build(temp_container, False, 1024, size, block_size)
+    assert loaded.diff(current) == [0, 20, 37]
+    assert current.diff(manifest.build(temp_container, False, 4096, size, block_size, threads=1)) == []
+
+
+def test_layer_plan_detects_overlaps(tmp_path) -> None:
+    from modules import layers, zip
+    from utils.data_utils import parse_size
+
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "a.bin").write_bytes(os.urandom(50000))
+    (source / "b.bin").write_bytes(os.urandom(70000))
+    config = {"files": [""], "directories": [str(source)], "password": "12"}
+
+    container = tmp_path / "container"
+    container.write_bytes(os.urandom(1024 * 1024))
+    size = zip.zip_archive(str(container), 0, [""], [str(source)], "", 4096, False)
+    assert 0 < size <= layers.archive_size_bound(config)
+
+    block_size = 1024 * 1024
+    far = dict(config, password="1234567")
+    near = dict(config, password="123", hashsum_limit="2m")
+    extents = layers.plan([config, far, near], block_size, parse_size)
+    assert [extent.start for extent in extents] == [2 * block_size, 7 * block_size, 3 * block_size]
+    assert layers.conflicts(extents[:2], 10 * block_size) == []
+    # the hashsum region of the third layer reaches into the first one
+    assert layers.conflicts(extents, 10 * block_size) == [(0, 2)]
+    # a layer that may run past the container end conflicts with itself
+    assert layers.conflicts(extents[:2], 7 * block_size + 1000) == [(1, 1)]
+
+    assert layers.worker_count(4, 3, 4 * 1024 * 1024, parse_size("2G")) == 3
+    assert layers.worker_count(4, 6, 4 * 1024 * 1024, parse_size("200M")) == 2
+
+
+def test_layer_groups_and_merge(tmp_path) -> None:
+    from modules import layers
+
+    jobs = ["a", "b", "c", "d", "e"]
+    assert layers.group_by_offset(jobs, 2) == [["a", "b"], ["c", "d", "e"]]
+    assert layers.group_by_offset(jobs[:2], 4) == [["a"], ["b"]]
+
+    output = tmp_path / "out"
+    for layer, content in (("layer1", b"first"), ("layer2", b"second")):
+        (output / layer / "sub").mkdir(parents=True)
+        (output / layer / "sub" / "same.txt").write_bytes(content)
+        (output / layer / f"{layer}.txt").write_bytes(content)
+
+    assert layers.merge_output(str(output / "layer1"), str(output), "layer1") == []
+    renamed = layers.merge_output(str(output / "layer2"), str(output), "layer2")
+    assert renamed == [str(output / "sub" / "same.layer2.txt")]
+    assert (output / "sub" / "same.txt").read_bytes() == b"first"
+    assert (output / "sub" / "same.layer2.txt").read_bytes() == b"second"
+    assert sorted(os.listdir(output)) == ["layer1.txt", "layer2.txt", "sub"]
+
+
+def test_plan_estimates_without_running(tmp_path) -> None:
+    import json
+    from modules import plan
+
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "a.bin").write_bytes(os.urandom(200000))
+    container = tmp_path / "container"
+    bench = tmp_path / "bench.json"
+    bench.write_text(json.dumps({"targets": [{"target": "tempfile", "results": [
+        {"op": "create_noise", "buffer_size": 65536, "mb_s": 50.0},
+        {"op": "aes_encrypt", "buffer_size": 65536, "workers": 1, "mb_s": 100.0},
+        {"op": "aes_encrypt", "buffer_size": 4194304, "workers": 1, "mb_s": 400.0},
+    ]}]}))
+    data = {"container_path": str(container), "block_size": "1m", "buffer_size": "64k",
+            "new_container_size": "10m", "split_mode": True,
+            "encrypt": [{"files": [""], "directories": [str(source)], "password": "12"}]}
+
+    result = plan.build(data, str(tmp_path / "calibration.json"), str(bench))
+    assert not container.exists()
+    assert result.protocol == "encrypt_split"
+    assert [stage.name for stage in result.stages] == ["noise", "zip", "encrypt", "split"]
+    assert result.stages[0].written == 10 * 1024 * 1024
+    assert result.stages[0].seconds == pytest.approx(10 / 50)
+    encrypt = result.stages[2]
+    assert encrypt.seconds == pytest.approx(encrypt.processed / (100 * 1024**2))
+    assert result.stages[1].seconds is None
+    name, start, end = result.extents[0]
+    assert start == 2 * 1024 * 1024 and end - start > 200000
+    assert result.scratch == 10 * 1024 * 1024
+    assert plan.format_plan(result)[0] == "protocol: encrypt_split"
+
+
+def test_incremental_update_rewrites_only_the_tail(temp_container: str, tmp_path) -> None:
+    import zipfile
+    from modules import zip
+
+    buffer_size = 4096
+    offset = 1500
+    source = tmp_path / "src"
+    source.mkdir()
+    for i in range(10):
+        (source / f"file{i}.bin").write_bytes(os.urandom(20000))
+    with open(temp_container, "wb") as f:
+        f.write(os.urandom(1024 * 1024))
+    aes_obj = aes.Aes(buffer_size)
+    aes_obj.init_cipher("test_password")
+    size = zip.zip_archive(temp_container, offset, [""], [str(source)], "", buffer_size, False, aes_obj)
+    with open(temp_container, "rb") as f:
+        before = f.read()
+
+    assert zip.update_archive(temp_container, offset, size, [""], [str(source)], "",
+                              buffer_size, False, aes_obj, 0.5) == (size, 0, 0)
+    with open(temp_container, "rb") as f:
+        assert f.read() == before
+
+    with aes_obj.open_reader(temp_container, "test_password", offset, offset + size) as reader:
+        old_start_dir = zipfile.ZipFile(reader).start_dir
+    (source / "file3.bin").write_bytes(os.urandom(20000))
+    os.utime(source / "file3.bin", (0, 315532800 + 86400))
+    (source / "file5.bin").unlink()
+    (source / "new.bin").write_bytes(b"new member")
+    new_size, changed, removed = zip.update_archive(temp_container, offset, size, [""], [str(source)], "",
+                                                    buffer_size, False, aes_obj, 0.5)
+    assert (changed, removed) == (2, 1)
+
+    with open(temp_container, "rb") as f:
+        after = f.read()
+    # units before the one holding the old central directory are untouched
+    untouched = offset + old_start_dir // buffer_size * buffer_size
+    assert after[:untouched] == before[:untouched]
+
+    with aes_obj.open_reader(temp_container, "test_password", offset, offset + new_size) as reader:
+        with zipfile.ZipFile(reader) as zipf:
+            assert zipf.testzip() is None
+            names = {name.split("/")[-1] for name in zipf.namelist()}
+            assert "file5.bin" not in names and "new.bin" in names
+            assert zipf.read("src/file3.bin") == (source / "file3.bin").read_bytes()
+            assert zipf.read("src/file7.bin") == (source / "file7.bin").read_bytes()
+
+    # too much dead space asks for a full rebuild and leaves the layer alone
+    for i in (0, 1, 2, 4):
+        (source / f"file{i}.bin").unlink()
+    assert zip.update_archive(temp_container, offset, new_size, [""], [str(source)], "",
+                              buffer_size, False, aes_obj, 0.5) is None
+    with open(temp_container, "rb") as f:
+        assert f.read() == after
+
+
+def test_incremental_update_rejects_a_corrupted_layer(temp_container: str, tmp_path) -> None:
+    from modules import zip
+
+    buffer_size = 4096
+    offset = 1500
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "a.bin").write_bytes(os.urandom(20000))
+    with open(temp_container, "wb") as f:
+        f.write(os.urandom(1024 * 1024))
+    aes_obj = aes.Aes(buffer_size)
+    aes_obj.init_cipher("test_password")
+    with open(temp_container, "rb") as f:
+        before = f.read()
+
+    # the layer range holds noise instead of an archive
+    assert zip.update_archive(temp_container, offset, 100000, [""], [str(source)], "",
+                              buffer_size, False, aes_obj, 0.5) is None
+    with open(temp_container, "rb") as f:
+        assert f.read() == before
+
+
+def test_extra_directory_change_includes_removed_files(tmp_path) -> None:
+    import zipfile
+    from modules import zip
+
+    extra = tmp_path / "extra"
+    (extra / "sub").mkdir(parents=True)
+    (extra / "a.txt").write_text("a")
+    (extra / "sub" / "b.txt").write_text("b")
+    info = zipfile.ZipInfo("extra" + zip.SECRET_EXTENSION, date_time=(2107, 12, 31, 23, 59, 58))
+    info.comment = zip.extra_members(str(extra))
+    assert not zip.extra_changed(info, str(extra))
+
+    (extra / "sub" / "b.txt").unlink()
+    assert zip.extra_changed(info, str(extra))
+    # an entry written without the member set is rebuilt
+    assert zip.extra_changed(zipfile.ZipInfo("extra" + zip.SECRET_EXTENSION), str(extra))
+
+
+def test_compression_policy_stores_incompressible_members(temp_container: str, tmp_path) -> None:
+    import io
+    import zipfile
+    from modules import zip
+
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "photo.jpg").write_bytes(b"a" * 50000)
+    (source / "random.bin").write_bytes(os.urandom(50000))
+    (source / "text.txt").write_bytes(b"compressible line\n" * 5000)
+    (source / "small.bin").write_bytes(os.urandom(100))
+
+    policy = zip.CompressionPolicy("lzma")
+    assert policy.choose(str(source / "photo.jpg")) == (zipfile.ZIP_STORED, None)
+    assert policy.choose(str(source / "random.bin")) == (zipfile.ZIP_STORED, None)
+    assert policy.choose(str(source / "text.txt")) == (zipfile.ZIP_LZMA, None)
+    assert policy.choose(str(source / "small.bin")) == (zipfile.ZIP_LZMA, None)
+    assert zip.CompressionPolicy.from_config({"compression": "bzip2", "compression_level": "9"}).choose(
+        str(source / "text.txt")) == (zipfile.ZIP_BZIP2, 9)
+    assert zip.CompressionPolicy("zstd").codec == "deflate"
+
+    with open(temp_container, "wb") as f:
+        f.write(bytes(1024 * 1024))
+    size = zip.zip_archive(temp_container, 0, [""], [str(source)], "", 4096, False, None,
+                           zip.CompressionPolicy("bzip2", 1))
+    with open(temp_container, "rb") as f:
+        archive = f.read(size)
+    with zipfile.ZipFile(io.BytesIO(archive)) as zipf:
+        types = {os.path.basename(info.filename): info.compress_type for info in zipf.infolist()}
+        assert zipf.testzip() is None
+    assert types["random.bin"] == zipfile.ZIP_STORED
+    assert types["photo.jpg"] == zipfile.ZIP_STORED
+    assert types["text.txt"] == zipfile.ZIP_BZIP2
+
+
+def test_parallel_compression_matches_serial_archive(temp_container: str, tmp_path, monkeypatch) -> None:
+    import io
+    import zipfile
+    from modules import zip
+
+    source = tmp_path / "src"
+    (source / "nested" / "empty").mkdir(parents=True)
+    (source / "text.txt").write_bytes(b"compressible line\n" * 20000)
+    (source / "nested" / "random.bin").write_bytes(os.urandom(60000))
+    (source / "nested" / "photo.jpg").write_bytes(b"b" * 30000)
+    loose = tmp_path / "loose.txt"
+    loose.write_bytes(b"loose file\n" * 1000)
+    # spill the larger members to temporary files as well
+    monkeypatch.setattr(zip, "member_spool_limit", 64 * 1024)
+
+    archives = []
+    for workers in (1, 2):
+        with open(temp_container, "wb") as f:
+            f.write(bytes(1024 * 1024))
+        size = zip.zip_archive(temp_container, 0, [str(loose)], [str(source)], "", 4096, False, None,
+                               zip.CompressionPolicy("deflate"), workers)
+        with open(temp_container, "rb") as f:
+            archives.append(f.read(size))
+
+    assert archives[0] == archives[1]
+    with zipfile.ZipFile(io.BytesIO(archives[1])) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.read("loose.txt") == loose.read_bytes()
+
+
+def test_parallel_compression_skips_a_failed_member(temp_container: str, tmp_path) -> None:
+    import io
+    import zipfile
+    from tqdm import tqdm
+    from modules import zip
+    from modules.container_io import ContainerWriter
+
+    first = tmp_path / "first.txt"
+    first.write_bytes(b"first\n" * 1000)
+    last = tmp_path / "last.txt"
+    last.write_bytes(b"last\n" * 1000)
+    # the middle member is picked by its extension and its worker fails to
+    # open the file
+    entries = {"first.txt": str(first), "missing.jpg": str(tmp_path / "missing.jpg"), "last.txt": str(last)}
+
+    archive = io.BytesIO()
+    with zip.MemberZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        with tqdm(total=3, disable=True) as pbar:
+            zip.write_members_parallel(zipf, entries, zip.CompressionPolicy("deflate"), 2, pbar)
+    with zipfile.ZipFile(archive) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == ["first.txt", "last.txt"]
+
+    # a member cut off by the end of the range leaves the archive as it was
+    with open(temp_container, "wb") as f:
+        f.write(bytes(64 * 1024))
+    writer = ContainerWriter(temp_container, 0, 4096, False, limit=16 * 1024)
+    try:
+        with zip.MemberZipFile(writer, 'w', zipfile.ZIP_STORED) as zipf:
+            zipf.write_compressed(str(first), "first.txt", zipfile.ZIP_STORED,
+                                  zip.compress_member(str(first), zipfile.ZIP_STORED, None))
+            start_dir = zipf.start_dir
+            big = tmp_path / "big.bin"
+            big.write_bytes(os.urandom(32 * 1024))
+            with pytest.raises(OSError):
+                zipf.write_compressed(str(big), "big.bin", zipfile.ZIP_STORED,
+                                      zip.compress_member(str(big), zipfile.ZIP_STORED, None))
+            assert zipf.start_dir == start_dir and writer.size == start_dir
+            assert zipf.namelist() == ["first.txt"]
+        size = writer.size
+    finally:
+        writer.close()
+    with open(temp_container, "rb") as f:
+        with zipfile.ZipFile(io.BytesIO(f.read(size))) as zipf:
+            assert zipf.testzip() is None and zipf.namelist() == ["first.txt"]
+
+
+def test_auto_buffer_size_keeps_layers_decryptable(core_class, core_conf, layer_conf, tmp_path, monkeypatch) -> None:
+    from modules import calibrate
+    from modules.constants import Def_val
+    from utils.data_utils import parse_size
+
+    # the first run creates the container, the second one finds it and picks
+    # a read chunk that differs from the default
+    monkeypatch.setattr(calibrate, "probe", lambda *args: {128 * 1024: 1.0})
+
+    conf = {**core_conf, "buffer_size": "auto", "calibration_cache": str(tmp_path / "calibration.json")}
+    core_class(conf).encrypt_container([layer_conf])
+
+    core = core_class(conf)
+    assert core.io_size == 128 * 1024
+    assert core.buffer_size == parse_size(Def_val.buffer_size)
+    output = tmp_path / "out"
+    output.mkdir()
+    core.decrypt_container(str(output), {}, ["12345"])
+    assert (output / "src" / "data.bin").read_bytes() == (tmp_path / "src" / "data.bin").read_bytes()
+
+
+def test_interrupted_noise_fill_is_resumed(core_class, core_conf, monkeypatch) -> None:
+    from modules import noise
+
+    buffer_size = 64 * 1024
+    core = core_class({**core_conf, "new_container_size": "1m"})
+    core.noise_checkpoint_interval = f"{buffer_size}b"
+    make_source = noise.make_source
+
+    class Interrupted(Exception):
+        pass
+
+    class Failing:
+        def chunks(self, total, chunk_size, start):
+            for index, chunk in enumerate(make_source("secrets").chunks(total, chunk_size, start)):
+                if index == 4:
+                    raise Interrupted
+                yield chunk
+
+    monkeypatch.setattr(noise, "make_source", lambda *args: Failing())
+    with pytest.raises(Interrupted):
+        core.create_noise()
+    assert os.path.getsize(core.container_path) == 1024 * 1024
+    assert core.noise_pending()
+
+    monkeypatch.setattr(noise, "make_source", make_source)
+    core.create_noise()
+    assert not core.noise_pending()
+    with open(core.container_path, "rb") as f:
+        data = f.read()
+    assert all(data[position:position + buffer_size] != bytes(buffer_size)
+               for position in range(0, len(data), buffer_size))
+
+
+def test_noise_fill_restarts_when_the_container_was_removed(core_class, core_conf, layer_conf, monkeypatch) -> None:
+    from modules import noise
+
+    core = core_class({**core_conf, "noise_checkpoint_interval": "64k"})
+    assert core.noise_checkpoint_interval == "64k"
+
+    class Interrupted(Exception):
+        pass
+
+    save_checkpoint = noise.save_checkpoint
+
+    def save_then_stop(checkpoint_path, identity, size, offset):
+        # stop right after the first confirmed chunk past the start
+        save_checkpoint(checkpoint_path, identity, size, offset)
+        if offset:
+            raise Interrupted
+
+    monkeypatch.setattr(noise, "save_checkpoint", save_then_stop)
+    with pytest.raises(Interrupted):
+        core.create_noise()
+    monkeypatch.setattr(noise, "save_checkpoint", save_checkpoint)
+    os.remove(core.container_path)
+    assert core.noise_pending()
+
+    core.encrypt_container([layer_conf])
+    assert os.path.getsize(core.container_path) == 20 * 1024 * 1024
+    assert not os.path.exists(core.noise_checkpoint)
+
+
+def test_extra_member_is_extracted_inside_the_output(tmp_path, monkeypatch) -> None:
+    import io
+    import zipfile
+    from modules import zip
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zipf:
+        zipf.writestr("extra" + zip.SECRET_EXTENSION, b"rar data")
+        zipf.writestr("file.txt", b"text")
+    calls = []
+
+    def extra_decompress(archive_path, output_path):
+        with open(archive_path, "rb") as f:
+            calls.append((os.path.dirname(os.path.dirname(archive_path)), output_path, f.read()))
+
+    monkeypatch.setattr(zip, "extra_decompress", extra_decompress)
+    monkeypatch.chdir(tmp_path)
+    outputs = [tmp_path / "layer1", tmp_path / "layer2"]
+    for output in outputs:
+        output.mkdir()
+        with zipfile.ZipFile(archive) as zipf:
+            zip.extract_members(zipf, str(output))
+
+    assert calls == [(str(output), str(output), b"rar data") for output in outputs]
+    assert not (tmp_path / ("extra" + zip.SECRET_EXTENSION)).exists()
+    for output in outputs:
+        assert sorted(os.listdir(output)) == ["file.txt"]
+
+
+def load_package_module(monkeypatch, name: str):
+    # crypto/core/ still imports the crypto.constants module that does not
+    # exist, and its __init__ files pull in every submodule, so the module
+    # is loaded from its file with the parent packages stubbed out
+    import sys
+    import types
+    import importlib.util
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    constants = types.ModuleType("crypto.constants")
+    constants.Msg = types.SimpleNamespace(PBar=types.SimpleNamespace(
+        encrypting_file="Encrypting file", decrypting_file="Decrypting file"))
+    monkeypatch.setitem(sys.modules, "crypto.constants", constants)
+    for package in ("crypto.core", "crypto.core.encryption", "crypto.core.container"):
+        stub = types.ModuleType(package)
+        stub.__path__ = [os.path.join(root, *package.split(".")[1:])]
+        monkeypatch.setitem(sys.modules, package, stub)
+
+    spec = importlib.util.spec_from_file_location(name, os.path.join(root, *name.split(".")[1:]) + ".py")
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, name, module)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("buffer_size", [16, 1000, 4096])
+@pytest.mark.parametrize("data_size", [0, 1, 15, 16, 17, 4095, 10001])
+def test_stream_cbc_matches_encrypt_data(tmp_path, monkeypatch, buffer_size: int, data_size: int) -> None:
+    cbc = load_package_module(monkeypatch, "crypto.core.encryption.aes")
+    key, iv = os.urandom(32), os.urandom(16)
+    data = os.urandom(data_size)
+    plain = tmp_path / "plain.bin"
+    plain.write_bytes(data)
+
+    assert cbc.encrypt_file(str(plain), str(tmp_path / "enc.bin"), key, iv, buffer_size)
+    encrypted = (tmp_path / "enc.bin").read_bytes()
+    assert encrypted == cbc.encrypt_data(data, key, iv)
+    assert cbc.decrypt_file(str(tmp_path / "enc.bin"), str(tmp_path / "dec.bin"), key, iv, buffer_size)
+    assert (tmp_path / "dec.bin").read_bytes() == data
+
+    # pieces of uneven size through one reused output buffer
+    encryptor = cbc.StreamEncryptor(key, iv)
+    decryptor = cbc.StreamDecryptor(key, iv)
+    out = bytearray(buffer_size + 31)
+    streamed, restored = bytearray(), bytearray()
+    for start in range(0, data_size, buffer_size):
+        streamed += out[:encryptor.update_into(data[start:start + buffer_size], out)]
+    streamed += encryptor.finalize()
+    assert bytes(streamed) == encrypted
+    for start in range(0, len(encrypted), buffer_size - 1):
+        written = decryptor.update_into(encrypted[start:start + buffer_size - 1], out)
+        assert isinstance(written, int)
+        restored += out[:written]
+    restored += decryptor.finalize()
+    assert bytes(restored) == data
+
+
+@pytest.mark.parametrize("buffer_size", [16, 4096])
+def test_ctr_file_round_trip_and_ranges(tmp_path, monkeypatch, buffer_size: int) -> None:
+    cbc = load_package_module(monkeypatch, "crypto.core.encryption.aes")
+    key, nonce = os.urandom(32), cbc.generate_iv()
+    data = os.urandom(3 * 4096 + 7)
+    (tmp_path / "plain.bin").write_bytes(data)
+
+    assert cbc.crypt_file_parallel(str(tmp_path / "plain.bin"), str(tmp_path / "enc.bin"), key, nonce, buffer_size, 3)
+    encrypted = (tmp_path / "enc.bin").read_bytes()
+    assert len(encrypted) == len(data) and encrypted != data
+    assert cbc.crypt_file_parallel(str(tmp_path / "enc.bin"), str(tmp_path / "dec.bin"), key, nonce, buffer_size, 3)
+    assert (tmp_path / "dec.bin").read_bytes() == data
+    for offset, size in [(0, 1), (5, 30), (4095, 2), (4096, 4096), (len(data) - 3, 3)]:
+        assert cbc.read_range(str(tmp_path / "enc.bin"), key, nonce, offset, size) == data[offset:offset + size]
+    assert not cbc.crypt_file_parallel(str(tmp_path / "plain.bin"), str(tmp_path / "bad.bin"), key, nonce, 1000)
+
+
+def make_layer(members: dict) -> bytes:
+    import io
+    import zipfile
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zipf:
+        for name, data in members.items():
+            zipf.writestr(zipfile.ZipInfo(name, (2024, 1, 1, 0, 0, 0)), data)
+    return archive.getvalue()
+
+
+@pytest.fixture
+def chunk_store(tmp_path):
+    from modules import chunk_store
+
+    store = chunk_store.ChunkStore(str(tmp_path / "store"), "store password", 64 * 1024, 1000)
+    members = {"big.bin": os.urandom(200000), "small.txt": b"small file",
+               "changed.bin": os.urandom(70000)}
+    first = make_layer(members)
+    second = make_layer({**members, "changed.bin": os.urandom(70000), "added.bin": os.urandom(1000)})
+    return chunk_store, store, first, second
+
+
+def test_chunk_store_writes_only_changed_members(chunk_store) -> None:
+    import io
+    import zipfile
+
+    _, store, first, second = chunk_store
+    stats = store.put_generation("2024-01", io.BytesIO(first))
+    assert stats["new_bytes"] == stats["size"] == len(first)
+    assert store.put_generation("2024-01-again", io.BytesIO(first))["new_chunks"] == []
+
+    stats = store.put_generation("2024-02", io.BytesIO(second))
+    old = {chunk_id for chunk_id, _, _ in store.load_generation("2024-01")["chunks"]}
+    new = store.load_generation("2024-02")["chunks"]
+    with zipfile.ZipFile(io.BytesIO(second)) as zipf:
+        changed_at = zipf.getinfo("changed.bin").header_offset
+    # big.bin and small.txt come before the changed member
+    unchanged = [chunk for chunk in new if chunk[1] < changed_at]
+    assert unchanged and all(chunk_id in old for chunk_id, _, _ in unchanged)
+    assert len(stats["new_chunks"]) == len({chunk_id for chunk_id, _, _ in new} - old)
+    assert stats["new_bytes"] < 80000 + 2000
+
+
+def test_chunk_store_reads_only_required_chunks(chunk_store, tmp_path) -> None:
+    import io
+
+    _, store, first, _ = chunk_store
+    store.put_generation("2024-01", io.BytesIO(first))
+    every_chunk = [chunk_id for chunk_id, _, _ in store.load_generation("2024-01")["chunks"]]
+    read = []
+    read_chunk = store.read_chunk
+    store.read_chunk = lambda chunk_id: read.append(chunk_id) or read_chunk(chunk_id)
+
+    assert store.restore("2024-01", str(tmp_path / "layer.zip")) == len(first)
+    assert (tmp_path / "layer.zip").read_bytes() == first
+    assert read == every_chunk == store.required_chunks("2024-01")
+
+    read.clear()
+    assert store.extract("2024-01", str(tmp_path / "out"), "*.txt") == ["small.txt"]
+    assert (tmp_path / "out" / "small.txt").read_bytes() == b"small file"
+    required = store.required_chunks("2024-01", "*.txt")
+    assert set(read) <= set(required)
+    assert len(required) < len(every_chunk)
+
+
+def test_chunk_store_prune_removes_unreferenced_chunks(chunk_store, tmp_path) -> None:
+    import io
+
+    _, store, first, second = chunk_store
+    store.put_generation("2024-01", io.BytesIO(first))
+    store.put_generation("2024-02", io.BytesIO(second))
+    old = {chunk_id for chunk_id, _, _ in store.load_generation("2024-01")["chunks"]}
+    kept = {chunk_id for chunk_id, _, _ in store.load_generation("2024-02")["chunks"]}
+
+    assert store.prune(["2024-02"]) == len(old - kept)
+    assert store.generations() == ["2024-02"]
+    stored = {file for _, _, files in os.walk(tmp_path / "store" / "chunks") for file in files}
+    assert stored == kept
+    store.restore("2024-02", str(tmp_path / "layer.zip"))
+    assert (tmp_path / "layer.zip").read_bytes() == second
+
+
+def test_chunk_store_rejects_tampered_chunks(chunk_store, tmp_path) -> None:
+    import io
+    from cryptography.exceptions import InvalidTag
+
+    _, store, first, _ = chunk_store
+    store.put_generation("2024-01", io.BytesIO(first))
+    chunk_id = store.load_generation("2024-01")["chunks"][0][0]
+    with open(store.chunk_path(chunk_id), "r+b") as f:
+        f.seek(40)
+        byte = f.read(1)
+        f.seek(40)
+        f.write(bytes([byte[0] ^ 1]))
+
+    with pytest.raises(InvalidTag):
+        store.read_chunk(chunk_id)
+    with pytest.raises(InvalidTag):
+        store.restore("2024-01", str(tmp_path / "layer.zip"))
+
+
+def test_encryption_keeps_a_generation_in_the_chunk_store(core, layer_conf, tmp_path) -> None:
+    import zipfile
+    from modules import chunk_store
+
+    store_path = str(tmp_path / "store")
+    core.encrypt_container([{**layer_conf, "chunk_store": store_path}])
+    store = chunk_store.ChunkStore(store_path, layer_conf["password"])
+    [name] = store.generations()
+    with core.open_layer(layer_conf["password"]) as reader:
+        layer = reader.read()
+    assert store.restore(name, str(tmp_path / "layer.zip")) == len(layer)
+    assert (tmp_path / "layer.zip").read_bytes() == layer
+    with zipfile.ZipFile(tmp_path / "layer.zip") as zipf:
+        assert zipf.read("src/data.bin") == (tmp_path / "src" / "data.bin").read_bytes()
+
+
+def test_manifest_is_rebuilt_by_the_next_encryption(core_class, core_conf, layer_conf, tmp_path) -> None:
+    from modules import manifest
+
+    sidecar = str(tmp_path / "c.manifest")
+    core = core_class({**core_conf, "manifest": sidecar})
+
+    core.encrypt_container([layer_conf])
+    assert manifest.load(sidecar, ["12345"]) is not None
+
+    core.create_noise()
+    assert not os.path.exists(sidecar)
+    current = core.check_manifest(["12345"])
+    assert current is not None and current.size == 20 * 1024 * 1024
+    assert not os.path.exists(sidecar)
+
+    core.encrypt_container([layer_conf])
+    full = manifest.build(core_conf["container_path"], False, 64 * 1024, 20 * 1024 * 1024)
+    assert manifest.load(sidecar, ["12345"]).root == full.root
+
+
+def test_manifest_rehashes_only_the_written_layer(core_class, core_conf, layer_conf, tmp_path, monkeypatch, caplog) -> None:
+    import logging
+    from modules import manifest
+
+    sidecar = str(tmp_path / "c.manifest")
+    core = core_class({**core_conf, "manifest": sidecar})
+    core.encrypt_container([layer_conf])
+
+    # damage a block far from the layers, then add a second layer
+    with open(core_conf["container_path"], "r+b") as f:
+        f.seek(18 * 1024 * 1024)
+        f.write(os.urandom(16))
+    hashed = []
+    hash_blocks = manifest.hash_blocks
+    monkeypatch.setattr(manifest, "hash_blocks", lambda *args: hashed.extend(args[5]) or hash_blocks(*args))
+    core.encrypt_container([layer_conf, {**layer_conf, "password": "123"}])
+    assert hashed and max(hashed) < 18
+
+    # decryption does not hash the container unless verification is asked for
+    hashed.clear()
+    output = tmp_path / "out"
+    output.mkdir()
+    core.decrypt_container(str(output), {"readonly": True}, ["12345"])
+    assert hashed == []
+
+    core.manifest_verify = True
+    with caplog.at_level(logging.ERROR):
+        core.decrypt_container(str(output), {"readonly": True}, ["12345"])
+    assert len(hashed) == 20
+    assert "Block 18 " in caplog.text
+
+
+def test_layer_workers_reuse_parent_key_schedules(core, core_path, layer_conf, tmp_path, monkeypatch) -> None:
+    import pickle
+    import queue
+    from modules import keys, layers
+
+    # the configuration crosses a process boundary as a pickle
+    worker_conf = pickle.loads(pickle.dumps(core.worker_conf(["12345"])))
+
+    def derive(password):
+        raise AssertionError("workers must use the schedules they were given")
+
+    monkeypatch.setattr(keys, "derive", derive)
+    layers.encrypt_layer(core_path, worker_conf, False, layer_conf)
+    output = tmp_path / "out"
+    layers.decrypt_layers(core_path, worker_conf, False, [(str(output), "12345")], False, queue.Queue())
+    assert (output / "src" / "data.bin").read_bytes() == (tmp_path / "src" / "data.bin").read_bytes()
+
+
+@pytest.mark.parametrize("mode", [{}, {"list": True}, {"pattern": "*.bin"}])
+def test_wrong_password_gets_the_decoy_in_every_mode(core, layer_conf, tmp_path, mode: dict) -> None:
+    from modules.constants import Def_val
+
+    core.encrypt_container([layer_conf])
+    output = tmp_path / "out"
+    output.mkdir()
+    core.decrypt_container(str(output), {"decoy": True, **mode}, ["54321"])
+    assert os.listdir(output) == [Def_val.decoy_name]
+
+
+def test_archive_that_does_not_fit_keeps_the_layer_header(core, layer_conf, tmp_path) -> None:
+    core.encrypt_container([layer_conf])
+    extent = core.layer_range(layer_conf["password"])
+    assert extent is not None
+
+    # 16m of random data cannot fit the 15m left behind the layer offset
+    (tmp_path / "src" / "big.bin").write_bytes(os.urandom(16 * 1024 * 1024))
+    assert core.encrypt_archive({**layer_conf, "incremental": False}) is None
+    assert core.layer_range(layer_conf["password"]) == extent
@@ -49,14 +49,18 @@ def validate_password(password: str, expected_password: str) -> bool:
     # Используем secrets.compare_digest для защиты от атак по времени
     return secrets.compare_digest(password, expected_password)
 
-def handle_invalid_password(container_size: int, output_path: str) -> None:
+def handle_invalid_password(container_size: int, output_path: str, limit: Optional[int] = None) -> None:
     """
     Обрабатывает случай неверного пароля
     
     Args:
         container_size: Размер контейнера
         output_path: Путь для сохранения невалидного контейнера
+        limit: Максимальный размер случайного контейнера (ограничивает время работы)
     """
+    if limit is not None:
+        container_size = min(container_size, limit)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
     # Генерируем случайный контейнер вместо вывода ошибки
     generate_random_container(container_size, output_path)
     # Не выводим сообщение об ошибке, чтобы не дать информацию атакующему